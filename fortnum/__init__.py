@@ -1,2 +1,4 @@
 from fortnum.fortnum import Fortnum, MultipleParents, class_property,\
-    FortnumDescriptor, FortnumDoesNotExist
+    FortnumDescriptor, FortnumDoesNotExist, FrozenFortnum, AmbiguousFortnum, compile_tree, relations, \
+    InvalidFortnumValue, BulkValidationError, bulk_assign, FortnumSet, \
+    fold_key
@@ -0,0 +1,17 @@
+"""Benchmarks for fortnum, each module can be run with ``python -m fortnum.bench.<module>``"""
+import timeit
+
+
+def measure(func, number=None, repeat=5):
+    """Best time in seconds for a single call to func"""
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(title, rows):
+    print(title)
+    width = max(len(name) for name, _ in rows)
+    for name, seconds in rows:
+        print("  %s  %10.3f us" % (name.ljust(width), seconds * 1e6))
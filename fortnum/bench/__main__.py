@@ -0,0 +1,42 @@
+"""Runs fortnum.bench.suite, optionally saving the results and comparing them with those of an earlier run"""
+import argparse
+import sys
+from itertools import groupby
+
+from fortnum.bench import report
+from fortnum.bench.suite import CASES, SIZES, run, dump_results, load_results, compare
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fortnum.bench", description=__doc__)
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma separated tree sizes")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only this case, repeatable")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown counted as a regression, 0.2 is 20%%")
+    args = parser.parse_args(argv)
+
+    results = run([int(size) for size in args.sizes.split(",")], args.case)
+    for case, rows in groupby(results, key=lambda result: result["case"]):
+        report(case, [("%d" % row["size"], row["seconds"]) for row in rows])
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            dump_results(results, fp)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = load_results(fp)
+
+        regressions = 0
+        print("compared with %s" % args.baseline)
+        for case, size, before, seconds, regressed in compare(results, baseline, args.tolerance):
+            regressions += regressed
+            name = "%s[%d]" % (case, size)
+            print("  %s  %5.2fx%s" % (name.ljust(24), seconds / before, "  regression" if regressed else ""))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
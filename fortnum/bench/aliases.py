@@ -0,0 +1,38 @@
+"""deserialize of exact, normalized and unknown keys, compared to normalizing in a wrapper that scans the children"""
+from fortnum import Fortnum, FortnumDoesNotExist, fold_key
+from fortnum.bench import measure, report
+
+
+def scanning_deserialize(fortnum, key):
+    """The workaround used before normalize, scans the children for every call"""
+    key = fold_key(key)
+    for child in fortnum:
+        if fold_key(child.serialize()) == key:
+            return child
+    raise FortnumDoesNotExist(key)
+
+
+def run(size=100):
+    fruits = Fortnum("Fruits", normalize=fold_key, **{
+        "Fruit%d" % index: Fortnum("Fruit%d" % index, aliases=("Legacy%d" % index,)) for index in range(size)
+    })
+    last = "Fruit%d" % (size - 1)
+
+    def miss(deserialize):
+        try:
+            deserialize("  unknown ")
+        except FortnumDoesNotExist:
+            pass
+
+    report("%d children" % size, [
+        ("exact key", measure(lambda: fruits.deserialize(last))),
+        ("normalized key", measure(lambda: fruits.deserialize(" %s " % last.upper()))),
+        ("alias", measure(lambda: fruits.deserialize("legacy%d" % (size - 1)))),
+        ("repeated miss", measure(lambda: miss(fruits.deserialize))),
+        ("scanning wrapper, normalized key", measure(lambda: scanning_deserialize(fruits, " %s " % last.upper()))),
+        ("scanning wrapper, miss", measure(lambda: miss(lambda key: scanning_deserialize(fruits, key)))),
+    ])
+
+
+if __name__ == "__main__":
+    run()
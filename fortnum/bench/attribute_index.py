@@ -0,0 +1,40 @@
+"""Attribute queries over a large tree, Fortnum.filter and index_on compared to scanning descendants with getattr"""
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+
+
+def catalog(width, depth, name="Error", counter=None):
+    counter = counter if counter is not None else [0]
+    counter[0] += 1
+    attributes = dict(code="E%d" % counter[0], severity=counter[0] % 10)
+    if depth == 0:
+        return Fortnum(name, **attributes)
+    attributes.update({
+        "%s_%d" % (name, index): catalog(width, depth - 1, "%s_%d" % (name, index), counter) for index in range(width)
+    })
+    return Fortnum(name, **attributes)
+
+
+def run(width=30, depth=3):
+    root = catalog(width, depth)
+    code = "E%d" % (width ** depth)
+
+    def scan_code():
+        return next(fortnum for fortnum in root.descendants() if getattr(fortnum, "code", None) == code)
+
+    def scan_severity():
+        return [fortnum for fortnum in root.descendants() if getattr(fortnum, "severity", -1) >= 9]
+
+    size = sum(1 for _ in root.descendants())
+    report("%d fortnums" % size, [
+        ("build unique index", measure(lambda: root._attribute_index.__wrapped__(root, "code", True), number=1)),
+        ("descendants + getattr, code", measure(scan_code)),
+        ("index_on('code').get", measure(lambda: root.index_on("code", unique=True).get(code))),
+        ("descendants + getattr, severity >= 9", measure(scan_severity)),
+        ("filter(severity__gte=9)", measure(lambda: root.filter(severity__gte=9))),
+        ("filter(severity=9, code=...)", measure(lambda: root.filter(severity=9, code=code))),
+    ])
+
+
+if __name__ == "__main__":
+    run()
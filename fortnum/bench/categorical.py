@@ -0,0 +1,39 @@
+"""Memory and group by for fortnum columns as pandas object dtype compared to categoricals, requires pandas"""
+import random
+
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+
+
+class Statuses(Fortnum):
+    pending = Fortnum("Pending")
+    running = Fortnum("Running")
+    done = Fortnum("Done")
+    failed = Fortnum("Failed")
+
+
+def run(size=1000000):
+    import pandas
+
+    statuses = list(Statuses)
+    values = [random.choice(statuses) for _ in range(size)]
+    weights = [random.random() for _ in range(size)]
+
+    objects = pandas.DataFrame({"status": values, "weight": weights})
+    categoricals = pandas.DataFrame({"status": Statuses.to_categorical(values), "weight": weights})
+
+    for name, frame in (("object", objects), ("categorical", categoricals)):
+        report("%s dtype, %d rows" % (name, size), [
+            ("group by", measure(lambda: frame.groupby("status", observed=True)["weight"].sum(), number=3)),
+        ])
+        # Not deep, the fortnums themselves are shared and should not be counted per row
+        print("  memory:  %d bytes" % frame["status"].memory_usage(index=False))
+
+    report("conversion, %d rows" % size, [
+        ("to_categorical", measure(lambda: Statuses.to_categorical(values), number=1)),
+        ("from_categorical", measure(lambda: Statuses.from_categorical(categoricals["status"]), number=1)),
+    ])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,27 @@
+"""Repeated reads of choices, as by a form rendered many times, compared to the previous generator"""
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+
+
+def generator_choices(fortnum):
+    """The previous choices, a new generator for every read"""
+    return ((str(item), str(item)) for item in fortnum)
+
+
+def run(size=50, renders=1000):
+    countries = Fortnum("Countries", **{"Country%d" % index: Fortnum("Country%d" % index) for index in range(size)})
+
+    def render(choices):
+        for _ in range(renders):
+            for value, label in choices():
+                pass
+
+    report("%d renders of %d choices" % (renders, size), [
+        ("generator", measure(lambda: render(lambda: generator_choices(countries)), number=3)),
+        ("cached choices", measure(lambda: render(lambda: countries.choices), number=3)),
+        ("cached grouped_choices", measure(lambda: render(lambda: countries.grouped_choices), number=3)),
+    ])
+
+
+if __name__ == "__main__":
+    run()
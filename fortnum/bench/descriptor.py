@@ -0,0 +1,101 @@
+"""Get, set and memory for the FortnumDescriptor storage modes, and assignment of many rows with bulk_assign"""
+import tracemalloc
+
+from fortnum import Fortnum, FortnumDescriptor, bulk_assign
+from fortnum.bench import measure, report
+
+
+class Colors(Fortnum):
+    red = Fortnum("Red")
+    green = Fortnum("Green")
+    blue = Fortnum("Blue")
+
+
+class DictModel:
+    color = FortnumDescriptor("color", Colors, default=Colors.red)
+
+
+class SlotModel:
+    __slots__ = ("_color", "__weakref__")
+    color = FortnumDescriptor("color", Colors, default=Colors.red, slot="_color")
+
+
+class WeakModel:
+    pass
+
+
+WeakModel.color = FortnumDescriptor("color", Colors, default=Colors.red)  # No __set_name__, stored in the weak dict
+
+
+class CoerceModel:
+    color = FortnumDescriptor("color", Colors, default=Colors.red, coerce=True)
+
+
+class CodeModel:
+    color = FortnumDescriptor("color", Colors, default=Colors.red, coerce=True, store_code=True)
+
+
+def allocated(model, count):
+    """Bytes allocated for count instances with an assigned color"""
+    tracemalloc.start()
+    instances = [model() for _ in range(count)]
+    for instance in instances:
+        instance.color = Colors.green
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def run(count=100000):
+    for model in (WeakModel, DictModel, SlotModel):
+        instance = model()
+        instance.color = Colors.green
+
+        def set_color():
+            instance.color = Colors.blue
+
+        report(model.__name__, [
+            ("get", measure(lambda: instance.color)),
+            ("set", measure(set_color)),
+        ])
+        print("  memory for %d instances:  %d bytes" % (count, allocated(model, count)))
+
+    instance, coerced, coded = DictModel(), CoerceModel(), CodeModel()
+
+    def deserialize_and_set():
+        instance.color = Colors.deserialize("Blue")
+
+    def set_key():
+        coerced.color = "Blue"
+
+    def set_code():
+        coerced.color = 2
+
+    def set_code_stored():
+        coded.color = "Blue"
+
+    report("raw keys and codes", [
+        ("deserialize + set", measure(deserialize_and_set)),
+        ("set key, coerce", measure(set_key)),
+        ("set code, coerce", measure(set_code)),
+        ("set key, store_code", measure(set_code_stored)),
+        ("get, store_code", measure(lambda: coded.color)),
+    ])
+
+    rows = 20000
+    instances = [DictModel() for _ in range(rows)]
+    values = [(Colors.red, Colors.green, Colors.blue)[row % 3] for row in range(rows)]
+
+    def assign_each():
+        for instance, value in zip(instances, values):
+            instance.color = value
+
+    report("%d rows" % rows, [
+        ("assign each", measure(assign_each)),
+        ("bulk_assign", measure(lambda: bulk_assign(instances, "color", values))),
+        ("validate_many", measure(lambda: DictModel.__dict__["color"].validate_many(values))),
+    ])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,48 @@
+"""Set algebra and memory of FortnumSet compared to set and OrderedSet of the same children"""
+import random
+import tracemalloc
+
+from fortnum import Fortnum, FortnumSet
+from fortnum.bench import measure, report
+from fortnum.utils import OrderedSet
+
+
+def allocated(func):
+    tracemalloc.start()
+    kept = func()  # noqa: F841, keep the result alive while measuring
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def run(size=64, count=10000):
+    tags = Fortnum("Tags", **{"Tag%d" % index: Fortnum("Tag%d" % index) for index in range(size)})
+    children = list(tags)
+    rng = random.Random(0)
+    subsets = [rng.sample(children, size // 2) for _ in range(count)]
+    probe = children[-1]
+
+    constructors = (
+        ("set", set),
+        ("OrderedSet", OrderedSet),
+        ("FortnumSet", lambda subset: FortnumSet(tags, subset)),
+    )
+    for name, constructor in constructors:
+        sets = [constructor(subset) for subset in subsets]
+        pairs = list(zip(sets, sets[1:]))
+
+        report("%s, %d sets of %d out of %d children" % (name, count, size // 2, size), [
+            ("|", measure(lambda: [a | b for a, b in pairs], number=3)),
+            ("&", measure(lambda: [a & b for a, b in pairs], number=3)),
+            ("in", measure(lambda: [probe in a for a in sets], number=3)),
+        ])
+        print("  memory:  %d bytes" % allocated(lambda: [constructor(subset) for subset in subsets]))
+
+    masks = [int(FortnumSet(tags, subset)) for subset in subsets]
+    report("plain int masks, as stored in a database", [
+        ("|", measure(lambda: [a | b for a, b in zip(masks, masks[1:])], number=3)),
+    ])
+
+
+if __name__ == "__main__":
+    run()
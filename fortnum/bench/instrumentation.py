@@ -0,0 +1,34 @@
+"""Cost of deserialize, membership and descriptor set with instrumentation disabled and enabled"""
+from fortnum import Fortnum, FortnumDescriptor, instrumentation
+from fortnum.bench import measure, report
+
+
+class Colors(Fortnum):
+    red = Fortnum("Red")
+    green = Fortnum("Green")
+
+
+class Model:
+    color = FortnumDescriptor("color", Colors, default=Colors.red)
+
+
+def run():
+    instance = Model()
+
+    def set_color():
+        instance.color = Colors.green
+
+    cases = [
+        ("deserialize", lambda: Colors.deserialize("Green")),
+        ("contains", lambda: Colors.green in Colors),
+        ("descriptor set", set_color),
+    ]
+    for title, sinks in (("disabled", None), ("enabled", []), ("enabled, logging sink", [instrumentation.LoggingSink()])):
+        if sinks is not None:
+            instrumentation.enable(sinks)
+        report(title, [(name, measure(func)) for name, func in cases])
+        instrumentation.disable()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,46 @@
+"""Startup cost of declaring a large catalog eagerly compared to lazily, and of the first access to a lazy one"""
+from fortnum.bench import measure, report
+from fortnum.fortnum import FortnumMeta
+from fortnum.lazy import tree_from_dict
+
+
+def spec(name, width, depth):
+    if depth == 0:
+        return {"code": name.lower(), "weight": len(name)}
+    children = {"%s_%d" % (name, index): spec("%s_%d" % (name, index), width, depth - 1) for index in range(width)}
+    return dict(children, code=name.lower())
+
+
+def first_access(catalog, width, depth):
+    fortnum = catalog
+    for _ in range(depth):
+        fortnum = getattr(fortnum, "%s_%d" % (fortnum.__name__, width - 1))
+    return fortnum
+
+
+def run(width=10, depth=4):
+    catalog = spec("Root", width, depth)
+    lazy_catalog = []
+
+    def declare_lazy():
+        lazy_catalog[:] = [tree_from_dict("Root", catalog)]
+
+    def access():
+        declare_lazy()
+        first_access(lazy_catalog[0], width, depth)
+
+    def materialize():
+        declare_lazy()
+        FortnumMeta._materialize_lazy()
+
+    size = sum(width ** level for level in range(depth + 1))
+    report("%d fortnums declared from a dict" % size, [
+        ("eager", measure(lambda: tree_from_dict("Root", catalog, lazy=False), number=1)),
+        ("lazy", measure(declare_lazy, number=1)),
+        ("lazy + access one leaf", measure(access, number=1)),
+        ("lazy + materialize all", measure(materialize, number=1)),
+    ])
+
+
+if __name__ == "__main__":
+    run()
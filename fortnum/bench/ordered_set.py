@@ -0,0 +1,85 @@
+"""Compares fortnum.utils.OrderedSet with the linked list implementation it replaced"""
+import collections.abc
+import tracemalloc
+from weakref import proxy
+
+from fortnum.bench import measure, report
+from fortnum.utils import OrderedSet
+
+
+class Link(object):
+    __slots__ = 'prev', 'next', 'key', '__weakref__'
+
+
+class LinkedOrderedSet(collections.abc.MutableSet):
+    """The previous OrderedSet, a dict of links in a doubly linked list"""
+
+    def __init__(self, iterable=None):
+        self.__root = root = Link()
+        root.prev = root.next = root
+        self.__map = {}
+        if iterable is not None:
+            self |= iterable
+
+    def __len__(self):
+        return len(self.__map)
+
+    def __contains__(self, key):
+        return key in self.__map
+
+    def add(self, key):
+        if key not in self.__map:
+            self.__map[key] = link = Link()
+            root = self.__root
+            last = root.prev
+            link.prev, link.next, link.key = last, root, key
+            last.next = root.prev = proxy(link)
+
+    def discard(self, key):
+        if key in self.__map:
+            link = self.__map.pop(key)
+            link.prev.next = link.next
+            link.next.prev = link.prev
+
+    def __iter__(self):
+        root = self.__root
+        curr = root.next
+        while curr is not root:
+            yield curr.key
+            curr = curr.next
+
+
+def allocated(func):
+    """Bytes allocated by func and still alive when it returns"""
+    tracemalloc.start()
+    kept = func()  # noqa: F841, keep the result alive while measuring
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def run(size=1000):
+    keys = list(range(size))
+    other_keys = keys[size // 2:] + list(range(size, size + size // 2))
+
+    for cls in (LinkedOrderedSet, OrderedSet):
+        full = cls(keys)
+        other = cls(other_keys)
+
+        def discard():
+            s = cls(keys)
+            for key in keys:
+                s.discard(key)
+
+        report("%s, %d elements" % (cls.__name__, size), [
+            ("add", measure(lambda: cls(keys))),
+            ("add + discard", measure(discard)),
+            ("iterate", measure(lambda: list(full))),
+            ("&", measure(lambda: full & other)),
+        ])
+        # Fortnums typically hold many small sets, one or two parents each
+        print("  memory for 10000 sets of 2:  %d bytes" % allocated(lambda: [cls((1, 2)) for _ in range(10000)]))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,36 @@
+"""Pickled size and time of task payloads carrying fortnums, compared to carrying their serialized keys"""
+import pickle
+import random
+
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+
+
+class Statuses(Fortnum):
+    pending = Fortnum("Pending")
+    running = Fortnum("Running")
+    done = Fortnum("Done")
+    failed = Fortnum("Failed")
+
+
+def run(rows=10000):
+    statuses = list(Statuses)
+    rng = random.Random(0)
+    fortnums = [{"id": row, "status": rng.choice(statuses)} for row in range(rows)]
+    keys = [{"id": record["id"], "status": record["status"].serialize()} for record in fortnums]
+
+    def keys_round_trip():
+        loaded = pickle.loads(pickle.dumps(keys))
+        return [dict(record, status=Statuses.deserialize(record["status"])) for record in loaded]
+
+    print("%d records, fortnums: %d bytes, keys: %d bytes, single fortnum: %d bytes" % (
+        rows, len(pickle.dumps(fortnums)), len(pickle.dumps(keys)), len(pickle.dumps(Statuses.done))
+    ))
+    report("dumps + loads", [
+        ("fortnums", measure(lambda: pickle.loads(pickle.dumps(fortnums)), number=3)),
+        ("keys + deserialize", measure(keys_round_trip, number=3)),
+    ])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,33 @@
+"""Autocomplete over a large catalog, Fortnum.search compared to filtering descendants with startswith"""
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+
+
+def catalog(width, depth, name="Category"):
+    if depth == 0:
+        return Fortnum(name)
+    return Fortnum(name, **{
+        "%s_%d" % (name, index): catalog(width, depth - 1, "%s_%d" % (name, index)) for index in range(width)
+    })
+
+
+def run(width=30, depth=3):
+    root = catalog(width, depth)
+    prefix = "category_7_1"
+
+    def scan():
+        return [fortnum for fortnum in root.descendants() if fortnum.serialize().casefold().startswith(prefix)][:10]
+
+    size = sum(1 for _ in root.descendants())
+    report("%d fortnums, first 10 matches" % size, [
+        ("build index", measure(lambda: root._key_search.__wrapped__(root), number=1)),
+        ("descendants + startswith", measure(scan)),
+        ("search, short prefix", measure(lambda: root.search("cat"))),
+        ("search", measure(lambda: root.search(prefix))),
+        ("search_fuzzy, distance 1", measure(lambda: root.search_fuzzy("Category_7_1_x"))),
+        ("search_fuzzy, distance 2", measure(lambda: root.search_fuzzy("Categroy_7_1_x", max_distance=2))),
+    ])
+
+
+if __name__ == "__main__":
+    run()
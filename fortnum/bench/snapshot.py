@@ -0,0 +1,31 @@
+"""Rebuilding a configured tree with Fortnum(...) compared to loading it from a snapshot"""
+import io
+
+from fortnum import Fortnum
+from fortnum.bench import measure, report
+from fortnum.snapshot import dump_tree, load_tree
+
+
+def build(name, width, depth):
+    if depth == 0:
+        return Fortnum(name, code=name.lower(), weight=len(name))
+    children = {"%s_%d" % (name, index): build("%s_%d" % (name, index), width, depth - 1) for index in range(width)}
+    return Fortnum(name, code=name.lower(), **children)
+
+
+def run(width=10, depths=(3, 4)):
+    for depth in depths:
+        root = build("Root", width, depth)
+        fp = io.BytesIO()
+        dump_tree(root, fp)
+        snapshot = fp.getvalue()
+
+        size = sum(1 for _ in root.descendants(include_self=True))
+        report("%d fortnums, snapshot of %d bytes, %.1f per fortnum" % (size, len(snapshot), len(snapshot) / size), [
+            ("Fortnum(...)", measure(lambda: build("Root", width, depth), number=1, repeat=3)),
+            ("load_tree", measure(lambda: load_tree(io.BytesIO(snapshot)), number=1, repeat=3)),
+        ])
+
+
+if __name__ == "__main__":
+    run()
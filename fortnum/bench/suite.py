@@ -0,0 +1,170 @@
+"""
+Benchmarks of the fortnum hot paths on trees of growing size, run with ``python -m fortnum.bench``.
+
+Each case is a function of the tree size that builds what it needs and returns the function to time. The same cases
+are run by pytest-benchmark through tests/bench_fortnum.py.
+"""
+import json
+import platform
+import random
+import types
+
+from fortnum import Fortnum, FortnumDescriptor
+from fortnum.fortnum import FortnumRelation
+from fortnum.bench import measure
+
+SIZES = (10, 100, 1000, 10000, 100000)
+FORMAT = 1  # Version of the results format written by dump_results
+
+
+def class_tree(size):
+    """A root with size children, declared with class syntax"""
+    def body(namespace):
+        for index in range(size):
+            namespace["Item%d" % index] = types.new_class("Item%d" % index, (Fortnum,))
+    return types.new_class("Wide", (Fortnum,), exec_body=body)
+
+
+def wide_tree(size):
+    """A root with size children, declared with Fortnum(...)"""
+    return Fortnum("Wide", **{"Item%d" % index: Fortnum("Item%d" % index) for index in range(size)})
+
+
+def deep_tree(size):
+    """A chain of size fortnums, returns the root and the leaf"""
+    leaf = fortnum = Fortnum("Node%d" % size)
+    for index in range(size - 1, 0, -1):
+        fortnum = Fortnum("Node%d" % index, child=fortnum)
+    return fortnum, leaf
+
+
+def bench_class_creation(size):
+    return lambda: class_tree(size)
+
+
+def bench_one_liners(size):
+    return lambda: wide_tree(size)
+
+
+def bench_related_name(size):
+    return lambda: Fortnum(
+        "Wide", related_name="wide", **{"Item%d" % index: Fortnum("Item%d" % index) for index in range(size)}
+    )
+
+
+def bench_relation(size):
+    return lambda: Fortnum(
+        "Wide", relation=FortnumRelation(*(Fortnum("Item%d" % index) for index in range(size)), related_name="wide")
+    )
+
+
+def bench_add_children(size):
+    return lambda: Fortnum("Wide").add_children({"Item%d" % index: Fortnum("Item%d" % index) for index in range(size)})
+
+
+def bench_iterate(size):
+    wide = class_tree(size)
+    return lambda: list(wide)
+
+
+def bench_contains(size):
+    wide = class_tree(size)
+    items = list(wide)
+    return lambda: [item in wide for item in items]
+
+
+def bench_deserialize(size):
+    wide = class_tree(size)
+    keys = [item.serialize() for item in wide]
+    return lambda: [wide.deserialize(key) for key in keys]
+
+
+def bench_compare(size):
+    wide = class_tree(size)
+    items = list(wide)
+    pairs = list(zip(items, reversed(items)))
+    return lambda: [a < b for a, b in pairs]
+
+
+def bench_sorted(size):
+    wide = class_tree(size)
+    items = list(wide)
+    random.Random(size).shuffle(items)
+    return lambda: sorted(items)
+
+
+def bench_sort_key(size):
+    wide = class_tree(size)
+    items = list(wide)
+    random.Random(size).shuffle(items)
+    return lambda: sorted(items, key=wide.sort_key)
+
+
+def bench_descendants_wide(size):
+    wide = class_tree(size)
+    return lambda: list(wide.descendants())
+
+
+def bench_descendants_deep(size):
+    root, _ = deep_tree(size)
+    return lambda: list(root.descendants())
+
+
+def bench_ancestors_deep(size):
+    _, leaf = deep_tree(size)
+    return lambda: leaf.ancestors()
+
+
+def bench_descriptor(size):
+    wide = class_tree(size)
+    items = list(wide)
+
+    class Model:
+        item = FortnumDescriptor("item", wide, default=items[0])
+
+    instances = [Model() for _ in range(min(size, 1000))]
+
+    def set_and_get():
+        for instance, item in zip(instances, reversed(items)):
+            instance.item = item
+        return [instance.item for instance in instances]
+    return set_and_get
+
+
+CASES = {
+    name[len("bench_"):]: case for name, case in sorted(globals().items()) if name.startswith("bench_")
+}
+
+
+def run(sizes=SIZES, cases=None, repeat=3):
+    """Best time in seconds of each case and size, as a list of results"""
+    results = []
+    for name in cases or CASES:
+        for size in sizes:
+            results.append({"case": name, "size": size, "seconds": measure(CASES[name](size), repeat=repeat)})
+    return results
+
+
+def dump_results(results, fp):
+    json.dump({
+        "format": FORMAT,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "results": results,
+    }, fp, indent=2)
+
+
+def load_results(fp):
+    document = json.load(fp)
+    if document.get("format") != FORMAT:
+        raise ValueError("Unsupported results format %r, expected %d." % (document.get("format"), FORMAT))
+    return document["results"]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """(case, size, baseline seconds, seconds, regressed) for each result that has a baseline"""
+    previous = {(result["case"], result["size"]): result["seconds"] for result in baseline}
+    for result in results:
+        before = previous.get((result["case"], result["size"]))
+        if before is not None:
+            yield result["case"], result["size"], before, result["seconds"], result["seconds"] > before * (1 + tolerance)
@@ -1,7 +1,19 @@
-from collections import OrderedDict, Sized
-from weakref import WeakKeyDictionary
-
-from fortnum.utils import OrderedSet, RelatedFortnums
+import copyreg
+import importlib
+import pickle
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Set
+from functools import wraps
+from itertools import chain
+from numbers import Integral
+from types import MappingProxyType
+from weakref import WeakKeyDictionary, WeakSet, WeakValueDictionary
+
+from fortnum.utils import OrderedSet, RelatedFortnums, PreOrder, LowestCommonAncestors, KeySearch, \
+    AttributeIndex
 
 
 class FortnumException(Exception):
@@ -12,6 +24,18 @@ class FortnumDoesNotExist(FortnumException):
     pass
 
 
+class _KeyDoesNotExist(FortnumDoesNotExist):
+    # Raised by deserialize, the options are only listed in the message when it is formatted
+
+    def __init__(self, fortnum, key):
+        super().__init__(fortnum, key)
+        self.fortnum = fortnum
+        self.key = key
+
+    def __str__(self):
+        return "'%s' is not a valid option for '%s'. Try %s" % (self.key, self.fortnum, list(self.fortnum.key_index))
+
+
 class MultipleParents(FortnumException):
     pass
 
@@ -20,36 +44,181 @@ class UnableToAddRelatedFortnum(FortnumException):
     pass
 
 
+class FrozenFortnum(FortnumException):
+    pass
+
+
+class AmbiguousFortnum(FortnumException):
+    pass
+
+
+class InvalidFortnumValue(FortnumException, ValueError):
+    """A value rejected by a FortnumDescriptor, the message is only formatted when needed"""
+
+    def __init__(self, descriptor, value):
+        super().__init__(descriptor, value)
+        self.descriptor = descriptor
+        self.value = value
+
+    def __str__(self):
+        if self.value is None:
+            return "None not allowed."
+        return "'%s' is not a valid option for '%s'. Try %s" % (
+            self.value,
+            self.descriptor.attr,
+            list(self.descriptor.fortnum)
+        )
+
+
+class BulkValidationError(FortnumException, ValueError):
+    """Raised by bulk_assign, report lists every invalid value"""
+
+    def __init__(self, report):
+        super().__init__(report)
+        self.report = report
+
+    def __str__(self):
+        return str(self.report)
+
+
 class class_property(classmethod):
     def __get__(self, instance, owner):
         return super().__get__(instance, owner)()
 
 
+def tree_cached(method):
+    """Cache the result of a fortnum method, per arguments, until a child is added to the fortnum or below it"""
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(cls, *args):
+        key = (name,) + args if args else name
+        entry = cls._tree_cache.get(key)
+        if entry is not None and (entry[0] == cls._generation or cls.frozen):
+            return entry[1]
+
+        # Read the generation first, a tree changed by another thread while computing invalidates the value
+        generation = cls._generation
+        value = method(cls, *args)
+        cls._tree_cache[key] = (generation, value)
+        return value
+
+    return wrapper
+
+
 class FortnumRelation(list):
     def __init__(self, *fortnums, related_name=None):
         super(FortnumRelation, self).__init__(fortnums)
         self.related_name=related_name
 
 
-def register_related_fortnum(fortnum, related_name, target_fortnum):
-    if not related_name:
-        return
+class RelationRegistry(object):
+    """
+    Bulk queries over all related fortnum edges, the results are frozensets. The sources of a target are the
+    RelatedFortnums set stored on the target and the targets of a source are kept in its _related_targets, so
+    the edges live and die with the fortnums.
+    """
+
+    @staticmethod
+    def _sources(related_name, target):
+        related_fortnums = vars(target).get(related_name)
+        return related_fortnums if isinstance(related_fortnums, RelatedFortnums) else ()
+
+    def related_to_any(self, related_name, targets):
+        """Fortnums related through related_name to at least one of targets"""
+        return frozenset().union(*(self._sources(related_name, target) for target in targets))
+
+    def related_to_all(self, related_name, targets):
+        """Fortnums related through related_name to every one of targets"""
+        related = [self._sources(related_name, target) for target in targets]
+        if not related:
+            return frozenset()
+        return frozenset(min(related, key=len)).intersection(*related)
+
+    def targets_of(self, sources, related_name):
+        """Fortnums that at least one of sources is related to through related_name"""
+        return frozenset().union(*(source._related_targets.get(related_name, ()) for source in sources))
+
 
-    related_fortnums = getattr(target_fortnum, related_name, None)
-    if related_fortnums is None or related_fortnums == []:
-        related_fortnums = RelatedFortnums()
+relations = RelationRegistry()
+
+
+def register_related_fortnum(fortnum, related_name, target_fortnum):
+    register_related_fortnums(((fortnum, related_name, target_fortnum),))
+
+
+def register_related_fortnums(edges):
+    """
+    Relate fortnum to target_fortnum through related_name for each (fortnum, related_name, target_fortnum) of
+    edges. Nothing is changed unless every edge can be added, and each changed set is copied and published once.
+    """
+    sources, targets = OrderedDict(), OrderedDict()
+    for fortnum, related_name, target_fortnum in edges:
+        if related_name:
+            sources.setdefault((related_name, target_fortnum), []).append(fortnum)
+            targets.setdefault(fortnum, OrderedDict()).setdefault(related_name, []).append(target_fortnum)
+
+    related_sets = []
+    for (related_name, target_fortnum), fortnums in sources.items():
+        if target_fortnum.frozen:
+            raise FrozenFortnum("Unable to relate '%s' to '%s', it is frozen." % (fortnums[0], target_fortnum))
+
+        related_fortnums = getattr(target_fortnum, related_name, None)
+        if related_fortnums is None or related_fortnums == []:
+            related_fortnums = ()
+        elif not isinstance(related_fortnums, RelatedFortnums):
+            raise UnableToAddRelatedFortnum(
+                "Unable to add related fortnums to '%s' attribute '%s' it would override the value '%s'." %
+                (target_fortnum, related_name, related_fortnums)
+            )
+
+        # Copy on write, readers iterating the previous set are unaffected
+        related_sets.append((target_fortnum, related_name, RelatedFortnums(chain(related_fortnums, fortnums))))
+
+    for target_fortnum, related_name, related_fortnums in related_sets:
         setattr(target_fortnum, related_name, related_fortnums)
-    elif not isinstance(related_fortnums, RelatedFortnums):
-        raise UnableToAddRelatedFortnum(
-            "Unable to add related fortnums to '%s' attribute '%s' it would override the value '%s'." %
-            (target_fortnum, related_name, related_fortnums)
-        )
 
-    related_fortnums.add(fortnum)
+    for fortnum, added in targets.items():
+        related_targets = dict(fortnum._related_targets)
+        for related_name, target_fortnums in added.items():
+            related_targets[related_name] = related_targets.get(related_name, frozenset()).union(target_fortnums)
+        fortnum._related_targets = related_targets
+
+
+class _Collision(object):
+    """Registry entry for a key shared by more then one fortnum"""
+    __slots__ = ("fortnums", "__weakref__")
+
+    def __init__(self, *fortnums):
+        self.fortnums = WeakSet(fortnums)
+
+
+# Attributes set by FortnumMeta on every fortnum, as opposed to declared by the fortnum itself
+METACLASS_ATTRIBUTES = frozenset((
+    "frozen", "parent", "parents", "parent_index", "children", "key_index", "alias_index", "_misses", "_tree_cache",
+    "_generation", "_related_targets"
+))
+
+
+def fold_key(key):
+    """Normalization for Fortnum.normalize, ignores case and surrounding whitespace"""
+    return key.strip().casefold()
 
 
 class FortnumMeta(type):
-    _registry = {}
+    _registry = WeakValueDictionary()  # Key of every non abstract fortnum, see use_weak_registry
+    _collisions = set()  # Keeps the _Collision entries alive in a weak registry
+    _lazy = WeakSet()  # Fortnums whose children are not created yet, see fortnum.lazy
+    _lazy_keys = {}  # Where each key declared below a lazy fortnum is found, see fortnum.lazy
+    _lazy_specs = []  # Functions adding the keys of a lazy tree to _lazy_keys, called on the first lookup miss
+    miss_cache_size = 1024  # Keys remembered per fortnum as not found by deserialize, see Fortnum.normalize
+
+    # Held while registering fortnums. Registration replaces the children, key_index, parents, parent_index and
+    # related fortnums of existing fortnums with updated copies instead of changing them, so reads never lock.
+    # Adding children publishes the parents and parent_index of each child, then the key_index of the parent and
+    # last its children. A child is only a member once it is within the published children, so a child found by
+    # iterating the parent is also found by in, deserialize and comparisons, and a member is found by all of them.
+    _lock = threading.RLock()
 
     @classmethod
     def __prepare__(mcs, name, bases):
@@ -57,47 +226,254 @@ class FortnumMeta(type):
 
     def __new__(mcs, name, bases, classdict):
         # Create Fortnum class and add to registry
-        fortnum = type.__new__(mcs, name, bases, dict(classdict))
+        fortnum = type.__new__(mcs, name, bases, mcs._class_attributes(classdict))
+
+        # The new fortnum is not visible to other threads yet, its own children and key_index are filled in place
+        with mcs._lock:
+            # Identify children and register parent connections
+            item_class = fortnum.item_class
+            related_name = fortnum.related_name
+            edges = []
+            for key, value in classdict.items():
+                if issubclass(type(value), FortnumMeta):
+                    # Create related fortnum sets
+                    edges.append((fortnum, related_name, value))
+
+                    # Add children
+                    if item_class and not issubclass(value, item_class) or key == "item_class":
+                        continue
+                    fortnum.children[key] = value
+
+                if isinstance(value, FortnumRelation):
+                    edges.extend((fortnum, value.related_name or related_name, target) for target in value)
+
+            # Nothing is changed until every child is known to be valid
+            for child in fortnum.children.values():
+                if child.frozen:
+                    raise FrozenFortnum("Unable to add '%s' to '%s', '%s' is frozen." % (child, fortnum, child))
+            register_related_fortnums(edges)
+
+            # Add parent and key indexes
+            for index, child in enumerate(fortnum.children.values()):
+                fortnum.key_index[child.serialize()] = child
+                fortnum._index_aliases(fortnum.alias_index, child)
+                fortnum._index_child(index, child)
+
+            fortnum._register()
+        return fortnum
+
+    @classmethod
+    def use_weak_registry(mcs, weak=True):
+        """
+        The registry holds weak references by default, so fortnums created at runtime can be garbage collected.
+        With weak=False it keeps every registered fortnum alive.
+        """
+        with mcs._lock:
+            registry = WeakValueDictionary() if weak else {}
+            registry.update(FortnumMeta._registry)
+            FortnumMeta._registry = registry
+
+    def _register(self):
+        if self.abstract:
+            return
+
+        registry = FortnumMeta._registry
+        key = self.serialize()
+        registered = registry.get(key)
+        if registered is None:
+            registry[key] = self
+        elif isinstance(registered, _Collision):
+            registered.fortnums.add(self)
+        elif registered is not self:
+            collision = registry[key] = _Collision(registered, self)
+            FortnumMeta._collisions.add(collision)
+
+    @staticmethod
+    def _class_attributes(classdict):
+        # The declared attributes together with those in METACLASS_ATTRIBUTES, set before the class is created
+        attributes = dict(classdict)
 
         # Do not inherit abstract attribute
-        if "abstract" not in classdict:
-            fortnum.abstract = False
+        attributes.setdefault("abstract", False)
 
         # Initialize fortnum attributes
-        fortnum.parent = None
-        fortnum.parents = OrderedSet()
-        fortnum.parent_index = {}
-        fortnum.children = OrderedDict()
-
-        # Identify children and register parent connections
-        item_class = fortnum.item_class
-        related_name = fortnum.related_name
-        for key, value in classdict.items():
-            if issubclass(type(value), FortnumMeta):
-                # Create related fortnum sets
-                register_related_fortnum(fortnum, related_name, value)
-
-                # Add children
-                if item_class and not issubclass(value, item_class) or key == "item_class":
-                    continue
-                fortnum.children[key] = value
+        attributes.update(
+            frozen=False,
+            parent=None,
+            parents=OrderedSet(),
+            parent_index={},
+            children=OrderedDict(),
+            key_index={},
+            alias_index={},
+            _misses=OrderedDict(),
+            _tree_cache={},
+            _generation=0,  # Incremented when a child is added to the fortnum or below it, see tree_cached
+            _related_targets={},  # The fortnums related to by each related_name, see RelationRegistry
+        )
+        return attributes
+
+    def _index_child(self, index, child):
+        # Called with the lock held, publishes copies of the parents and parent_index of child
+        parents = OrderedSet(child.parents)
+        parents.add(self)
+        parent_index = dict(child.parent_index)
+        parent_index[self] = index
+
+        child.parent_index = parent_index
+        child.parents = parents
+        if child.parent is None:
+            child.parent = self
+
+    def _index_aliases(self, alias_index, child):
+        # The aliases of child, and with a normalize policy also its key, normalized
+        keys = child.__dict__.get("aliases", ())
+        normalize = self.normalize
+        if normalize is not None:
+            keys = [normalize(key) for key in chain((child.serialize(),), keys)]
+
+        for key in keys:
+            if alias_index.setdefault(key, child) is not child:
+                raise ValueError("'%s' and '%s' of '%s' are both found by '%s'." % (
+                    alias_index[key], child, self, key
+                ))
 
-            if isinstance(value, FortnumRelation):
-                for target_fortnum in value:
-                    register_related_fortnum(fortnum, value.related_name or related_name, target_fortnum)
+    def add_child(self, key, child):
+        """Add a child after the class has been declared, as if it was declared as ``key`` in the class body"""
+        self.add_children(((key, child),))
+
+    def add_children(self, items):
+        """
+        Add children after the class has been declared, items is a mapping or (key, child) pairs. The indexes are
+        copied once for all the children, use it rather than add_child in a loop.
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        with FortnumMeta._lock:
+            self._add_children(self.children, self.key_index, items)
+
+    def _add_children(self, children, key_index, items):
+        # Called with the lock held, the updated children and key_index replace the previous ones once complete
+        items = list(items)
+        keys, ancestors, alias_index = set(children), None, dict(self.alias_index)
+        for key, child in items:
+            if not issubclass(type(child), FortnumMeta):
+                raise TypeError("Only fortnums can be added as children. '%s' is of type '%s'" % (child, type(child)))
+
+            if self.item_class and not issubclass(child, self.item_class):
+                raise TypeError(
+                    "'%s' is not a subclass of the item class '%s' of '%s'" % (child, self.item_class, self)
+                )
+
+            if key in keys:
+                raise ValueError("'%s' already has a child named '%s'" % (self, key))
+            keys.add(key)
+
+            for fortnum in (self, child):
+                if fortnum.frozen:
+                    raise FrozenFortnum("Unable to add '%s' to '%s', '%s' is frozen." % (child, self, fortnum))
+
+            if ancestors is None:
+                ancestors = self._all_ancestors()
+            if child is self or child in ancestors:
+                raise ValueError("Unable to add '%s' to '%s', it would be its own descendant." % (child, self))
+
+            self._index_aliases(alias_index, child)
+
+        # Nothing is changed until every child is known to be valid
+        register_related_fortnums((self, self.related_name, child) for _, child in items)
+        children, key_index = OrderedDict(children), dict(key_index)
+        for key, child in items:
+            setattr(self, key, child)
+            children[key] = child
+            key_index[child.serialize()] = child
+            self._index_child(len(children) - 1, child)
+
+        # Publishing children makes the new children members, see FortnumMeta._lock
+        self.alias_index = alias_index
+        self._misses = OrderedDict()
+        self.key_index = key_index
+        self.children = children
+
+        # Only the fortnums listing the new children in their tree_cached values are invalidated
+        for fortnum in chain((self,), self._all_ancestors()):
+            fortnum._generation += 1
+
+    def _all_ancestors(self):
+        # Every fortnum above self through any of the parents, found walking up so no children are listed
+        ancestors = set()
+        remaining = list(self.parents)
+        while remaining:
+            parent = remaining.pop()
+            if parent not in ancestors:
+                ancestors.add(parent)
+                remaining.extend(parent.parents)
+        return ancestors
 
-        # Add parent index
-        for index, child in enumerate(fortnum.children.values()):
-            if child.parent is None:
-                child.parent = fortnum
-            child.parents.add(fortnum)
-            child.parent_index[fortnum] = index
+    def __setattr__(self, key, value):
+        if self.frozen:
+            raise FrozenFortnum("Unable to set '%s' on '%s', it is frozen." % (key, self))
+        super().__setattr__(key, value)
 
-        return fortnum
+    def __delattr__(self, key):
+        if self.frozen:
+            raise FrozenFortnum("Unable to delete '%s' from '%s', it is frozen." % (key, self))
+        super().__delattr__(key)
+
+    def __getattr__(self, key):
+        # Only called when the attribute is missing, a lazy fortnum creates its children if key is one of them
+        materialize = self.__dict__.get("_materialize")
+        if materialize is None or key not in materialize.keys:
+            raise AttributeError("type object '%s' has no attribute '%s'" % (self.__name__, key))
+        materialize()
+        return getattr(self, key)
+
+    @classmethod
+    def _materialize_lazy(mcs):
+        with mcs._lock:
+            while FortnumMeta._lazy:
+                for fortnum in list(FortnumMeta._lazy):
+                    fortnum._materialize()
+
+    @classmethod
+    def _materialize_key(mcs, key):
+        # Creates the lazy fortnums on the paths to those declared as key, True if any were declared
+        with mcs._lock:
+            while mcs._lazy_specs:
+                mcs._lazy_specs.pop()()
+
+            found = mcs._lazy_keys.pop(key, ())
+            for root, path in found:
+                keys = []
+                while path is not None:
+                    path, child_key = path
+                    keys.append(child_key)
+
+                fortnum = root()
+                for child_key in reversed(keys):
+                    if fortnum is None:
+                        break
+                    fortnum = fortnum.children.get(child_key)
+        return bool(found)
 
     def __iter__(self):
-        for fortnum in self.children.values():
-            yield fortnum
+        return iter(self.children.values())
+
+    def __contains__(self, item):
+        # A child being added is only a member once it is within the published children, see FortnumMeta._lock
+        if not isinstance(item, FortnumMeta):
+            return False
+        index = item.parent_index.get(self)
+        return index is not None and index < len(self.children)
+
+    def Set(self, *fortnums):
+        """FortnumSet of some of the children"""
+        return FortnumSet(self, fortnums)
+
+    def contains(self, item, deep=False):
+        """Membership test, with deep=True any descendant is considered a member"""
+        if deep:
+            return isinstance(item, FortnumMeta) and item is not self and item.is_descendant_of(self)
+        return item in self
 
     def __getitem__(self, item):
         return self.children.__getitem__(item)
@@ -116,11 +492,25 @@ class FortnumMeta(type):
 
     @property
     def choices(self):
-        return ((str(item), str(item)) for item in self.__iter__())
+        """(key, label) of each child, as a tuple cached until the tree changes"""
+        return self._choices()
+
+    @property
+    def choices_map(self):
+        """Each child by its key in choices"""
+        return self._choices_map()
+
+    @property
+    def grouped_choices(self):
+        """
+        choices with each child that has children of its own replaced by a group, (label, choices of its
+        descendants), the nested format used for optgroups
+        """
+        return self._grouped_choices()
 
     def common_parent(self, other):
-        if not issubclass(other, Fortnum):
-            return TypeError("Fortnums can only be compared with other fortnums. other is of type '%s'" % type(other))
+        if not isinstance(other, FortnumMeta):
+            raise TypeError("Fortnums can only be compared with other fortnums. other is of type '%s'" % type(other))
 
         try:
             return next(iter(self.parents & other.parents))
@@ -128,13 +518,71 @@ class FortnumMeta(type):
         except StopIteration:
             raise TypeError("Only fortnums with atleast one common parent can be compared.")
 
+    def _compared_indexes(self, other):
+        # Fast path, fortnums sharing their primary parent are compared without intersecting the parents
+        parent = self.parent
+        if parent is None or not isinstance(other, FortnumMeta) or other.parent is not parent:
+            parent = self.common_parent(other)
+        return self.parent_index[parent], other.parent_index[parent]
+
     def __gt__(self, other):
-        parent = self.common_parent(other)
-        return self.parent_index[parent].__gt__(other.parent_index[parent])
+        index, other_index = self._compared_indexes(other)
+        return index > other_index
+
+    def __ge__(self, other):
+        index, other_index = self._compared_indexes(other)
+        return index >= other_index
 
     def __lt__(self, other):
-        parent = self.common_parent(other)
-        return self.parent_index[parent].__lt__(other.parent_index[parent])
+        index, other_index = self._compared_indexes(other)
+        return index < other_index
+
+    def __le__(self, other):
+        index, other_index = self._compared_indexes(other)
+        return index <= other_index
+
+    def __reduce__(self):
+        # A reference resolved on loading, by the module global if there is one, else by the qualified key in the
+        # registry, else by the positions of the fortnum and its primary parents below the root
+        if _find_global(self.__module__, self.__qualname__) is self:
+            return self.__qualname__
+
+        qualified_key = self.qualified_key
+        try:
+            if Fortnum.lookup(qualified_key) is self:
+                return _lookup_fortnum, (self.__module__, qualified_key)
+        except FortnumException:
+            pass
+
+        ancestors = self.ancestors(ascending=True, include_self=True)
+        if len(ancestors) > 1:
+            path = tuple(reversed([fortnum.parent_index[fortnum.parent] for fortnum in ancestors[:-1]]))
+            return _fortnum_from_path, (ancestors[-1], path)
+
+        raise pickle.PicklingError("Unable to pickle '%s', it can not be found by its module, key or parents." % self)
+
+
+def _find_global(module, qualname):
+    obj = sys.modules.get(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name, None)
+    return obj
+
+
+def _lookup_fortnum(module, qualified_key):
+    if module not in sys.modules:
+        importlib.import_module(module)  # Declares the fortnums of the module
+    return Fortnum.lookup(qualified_key)
+
+
+def _fortnum_from_path(root, path):
+    fortnum = root
+    for code in path:
+        fortnum = fortnum._children_by_code()[code]
+    return fortnum
+
+
+copyreg.pickle(FortnumMeta, FortnumMeta.__reduce__)
 
 
 class Fortnum(metaclass=FortnumMeta):
@@ -142,11 +590,17 @@ class Fortnum(metaclass=FortnumMeta):
     parents = None  # Set by Metaclass
     children = None  # Set by Metaclass
     parent_index = None  # Set by Metaclass
+    key_index = None  # Set by Metaclass
     abstract = None  # Set by Metaclass
+    frozen = None  # Set by Metaclass
     item_class = None
     related_name = None
+    aliases = ()  # Other keys deserialize finds this fortnum by, not inherited
+    normalize = None  # Function applied to keys before deserialize looks them up among the aliases, like fold_key
 
     def __new__(cls, name, **kwargs):
+        # Like a class statement, the fortnum belongs to the calling module
+        kwargs.setdefault("__module__", sys._getframe(1).f_globals.get("__name__"))
         return FortnumMeta(name, (cls,), kwargs)
 
     @classmethod
@@ -154,15 +608,233 @@ class Fortnum(metaclass=FortnumMeta):
         return cls.__name__
 
     @classmethod
-    def deserialize(cls, name):
+    def deserialize(cls, key):
+        try:
+            return cls.key_index[key]
+        except KeyError:
+            return cls._deserialize_alias(key)
+
+    @classmethod
+    def deserialize_many(cls, keys):
+        if not isinstance(keys, (list, tuple)):
+            keys = list(keys)
+        key_index = cls.key_index
         try:
-            return {fortnum.name: fortnum for fortnum in cls}[name]
+            return [key_index[key] for key in keys]
         except KeyError:
-            raise FortnumDoesNotExist("'%s' is not a valid option for '%s'. Try %s" % (
-                name,
-                cls,
-                list(cls)
-            ))
+            return [key_index[key] if key in key_index else cls._deserialize_alias(key) for key in keys]
+
+    @classmethod
+    def _deserialize_alias(cls, key):
+        alias_index = cls.alias_index
+        if not alias_index:
+            raise cls._does_not_exist(key)
+
+        misses = cls._misses
+        if key in misses:
+            try:
+                misses.move_to_end(key)
+            except KeyError:  # Evicted by another thread
+                pass
+            raise cls._does_not_exist(key)
+
+        normalize = cls.normalize
+        try:
+            return alias_index[key if normalize is None else normalize(key)]
+        except (KeyError, TypeError, AttributeError):  # Also keys normalize does not accept
+            pass
+
+        misses[key] = None
+        while len(misses) > FortnumMeta.miss_cache_size:
+            try:
+                misses.popitem(last=False)
+            except KeyError:  # Emptied by another thread
+                break
+        raise cls._does_not_exist(key)
+
+    @classmethod
+    def sort_key(cls, fortnum):
+        """Position of a child of cls, for use as key in sorted, min and max"""
+        try:
+            return fortnum.parent_index[cls]
+        except (AttributeError, KeyError):
+            raise TypeError("'%s' is not a child of '%s' and can not be ordered by it." % (fortnum, cls))
+
+    @classmethod
+    def sorted(cls, fortnums, reverse=False):
+        return sorted(fortnums, key=cls.sort_key, reverse=reverse)
+
+    @classmethod
+    def encode(cls, fortnums):
+        """
+        Positions of fortnums among the children of cls, as an array of typecode 'H', or 'I' for more then 65536
+        children. A NumPy array of fortnums is encoded to a NumPy array of unsigned integers.
+        """
+        codes = cls._codes()
+        numpy = sys.modules.get("numpy")
+        try:
+            if numpy is not None and isinstance(fortnums, numpy.ndarray):
+                dtype = numpy.uint16 if len(codes) <= 0x10000 else numpy.uint32
+                return numpy.fromiter(map(codes.__getitem__, fortnums.ravel()), dtype, fortnums.size).reshape(
+                    fortnums.shape
+                )
+            return array("H" if len(codes) <= 0x10000 else "I", map(codes.__getitem__, fortnums))
+        except KeyError as error:
+            raise FortnumDoesNotExist("'%s' is not a child of '%s'" % (error.args[0], cls))
+
+    @classmethod
+    def decode(cls, codes):
+        """Inverse of encode, a list of fortnums or for a NumPy array of codes a NumPy object array"""
+        children = cls._children_by_code()
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(codes, numpy.ndarray):
+            if codes.size and (codes.min() < 0 or codes.max() >= len(children)):
+                raise FortnumDoesNotExist("Codes must be in the range 0 to %d for '%s'" % (len(children) - 1, cls))
+
+            lookup = numpy.empty(len(children), dtype=object)
+            for code, child in children.items():
+                lookup[code] = child
+            return lookup[codes]
+
+        try:
+            return list(map(children.__getitem__, codes))
+        except KeyError as error:
+            raise FortnumDoesNotExist("'%s' is not a valid code for '%s'" % (error.args[0], cls))
+
+    @classmethod
+    def to_categorical(cls, fortnums, ordered=False, library="pandas"):
+        """
+        Convert fortnums, children of cls or None, to a pandas Categorical or with library="pyarrow" to a pyarrow
+        DictionaryArray. The categories are the serialized children of cls in order.
+        """
+        codes = dict(cls._codes())
+        codes[None] = -1 if library == "pandas" else None
+        try:
+            indices = list(map(codes.__getitem__, fortnums))
+        except KeyError as error:
+            raise FortnumDoesNotExist("'%s' is not a child of '%s'" % (error.args[0], cls))
+
+        if library == "pandas":
+            import pandas
+            return pandas.Categorical.from_codes(indices, categories=cls._keys(), ordered=ordered)
+
+        if library == "pyarrow":
+            import pyarrow
+            return pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(indices, type=pyarrow.int32()),
+                pyarrow.array(cls._keys(), type=pyarrow.string()),
+                ordered=ordered
+            )
+
+        raise ValueError("Unknown library '%s', use 'pandas' or 'pyarrow'." % library)
+
+    @classmethod
+    def from_categorical(cls, categorical):
+        """Inverse of to_categorical, accepts a pandas Categorical or Series and pyarrow (Chunked)DictionaryArray"""
+        if hasattr(categorical, "cat"):  # pandas Series
+            categorical = categorical.cat
+
+        if hasattr(categorical, "chunks"):  # pyarrow ChunkedArray
+            return [fortnum for chunk in categorical.chunks for fortnum in cls.from_categorical(chunk)]
+
+        if hasattr(categorical, "indices"):  # pyarrow DictionaryArray
+            lookup = cls.deserialize_many(categorical.dictionary.to_pylist())
+            return [None if code is None else lookup[code] for code in categorical.indices.to_pylist()]
+
+        lookup = cls.deserialize_many(categorical.categories)
+        return [None if code < 0 else lookup[code] for code in categorical.codes.tolist()]
+
+    @classmethod
+    @tree_cached
+    def _keys(cls):
+        return tuple(child.serialize() for child in cls.children.values())
+
+    @classmethod
+    @tree_cached
+    def _codes(cls):
+        return {child: code for code, child in enumerate(cls.children.values())}
+
+    @classmethod
+    @tree_cached
+    def _children_by_code(cls):
+        return dict(enumerate(cls.children.values()))
+
+    @classmethod
+    @tree_cached
+    def _choices(cls):
+        return tuple((str(child), str(child)) for child in cls.children.values())
+
+    @classmethod
+    @tree_cached
+    def _choices_map(cls):
+        return MappingProxyType({str(child): child for child in cls.children.values()})
+
+    @classmethod
+    @tree_cached
+    def _grouped_choices(cls):
+        return tuple(
+            (str(child), tuple((str(descendant), str(descendant)) for descendant in child.descendants()))
+            if child.children else (str(child), str(child))
+            for child in cls.children.values()
+        )
+
+    @classmethod
+    @tree_cached
+    def _coercions(cls):
+        # Each child by itself and by its serialized key, codes are looked up in _children_by_code
+        coercions = {}
+        for child in cls.children.values():
+            coercions[child] = coercions[child.serialize()] = child
+        return coercions
+
+    @classmethod
+    def _does_not_exist(cls, key):
+        return _KeyDoesNotExist(cls, key)
+
+    @class_property
+    def qualified_key(cls):
+        return ".".join(fortnum.serialize() for fortnum in cls.ancestors(include_self=True))
+
+    @staticmethod
+    def lookup(key):
+        """
+        Find a non abstract fortnum by its key or a qualified key, like "StoneFruits.Mango". A qualified key starts
+        with the key of any fortnum followed by the keys of the children leading to the wanted fortnum.
+        """
+        fortnum = FortnumMeta._registry.get(key)
+        if fortnum is None and "." in key:
+            keys = key.split(".")
+            fortnum = Fortnum.lookup(keys[0])
+            for child_key in keys[1:]:
+                try:
+                    fortnum = fortnum.key_index[child_key]
+                except KeyError:
+                    raise FortnumDoesNotExist("'%s' has no child '%s'." % (fortnum.qualified_key, child_key))
+            return fortnum
+
+        if isinstance(fortnum, _Collision):
+            fortnums = list(fortnum.fortnums)
+            if len(fortnums) > 1:
+                raise AmbiguousFortnum("'%s' matches %s, use a qualified key." % (
+                    key,
+                    sorted(fortnum.qualified_key for fortnum in fortnums)
+                ))
+            fortnum = fortnums[0] if fortnums else None
+
+        if fortnum is None:
+            if FortnumMeta._materialize_key(key):
+                return Fortnum.lookup(key)
+            raise FortnumDoesNotExist("No fortnum with the key '%s'." % key)
+        return fortnum
+
+    @staticmethod
+    def lookup_many(keys):
+        lookup = Fortnum.lookup
+        return [lookup(key) for key in keys]
+
+    @classmethod
+    def freeze(cls):
+        return compile_tree(cls)
 
     @class_property
     def subclasses(cls):
@@ -180,74 +852,529 @@ class Fortnum(metaclass=FortnumMeta):
 
     @classmethod
     def descendants(cls, include_self=False):
-        if include_self:
-            yield cls
+        return iter(cls.root()._pre_order().subtree(cls, include_self))
 
-        for child in cls:
-            yield child
+    @classmethod
+    def search(cls, prefix, limit=10):
+        """Descendants with a key or alias starting with prefix, ignoring case, in tree order"""
+        return cls._key_search().prefix(prefix.casefold(), limit)
 
-            for descendant in child.descendants():
-                yield descendant
+    @classmethod
+    def search_fuzzy(cls, key, max_distance=1, limit=10):
+        """Descendants with a key or alias at most max_distance edits from key, ignoring case, in tree order"""
+        return cls._key_search().within(key.casefold(), max_distance, limit)
+
+    @classmethod
+    def index_on(cls, attribute, unique=False):
+        """
+        Index of the descendants, instances of item_class if set, by the value of attribute. Descendants without
+        the attribute are left out, with unique=True two descendants sharing a value raise ValueError.
+        """
+        return cls._attribute_index(attribute, unique)
+
+    @classmethod
+    def filter(cls, **criteria):
+        """
+        Descendants, instances of item_class if set, matching all criteria in tree order. A criterion is
+        attribute=value or attribute__lookup=value, with lookup one of exact, in, gt, gte, lt and lte. Any other
+        lookup on an attribute of the descendants raises ValueError.
+        """
+        positions = None
+        for criterion, value in criteria.items():
+            attribute, _, lookup = criterion.rpartition("__")
+            if not attribute or lookup not in AttributeIndex.LOOKUPS:
+                if attribute and not cls._has_attribute(criterion) and cls._has_attribute(attribute):
+                    raise ValueError("Unknown lookup '%s' in '%s', use one of %s." % (
+                        lookup, criterion, sorted(AttributeIndex.LOOKUPS)
+                    ))
+                attribute, lookup = criterion, "exact"
+
+            found = cls._attribute_index(attribute, False).positions(lookup, value)
+            positions = set(found) if positions is None else positions.intersection(found)
+            if not positions:
+                return []
+
+        descendants = cls._indexed_descendants()
+        if positions is None:
+            return list(descendants)
+        return [descendants[position] for position in sorted(positions)]
+
+    @classmethod
+    def _has_attribute(cls, attribute):
+        return any(hasattr(fortnum, attribute) for fortnum in cls._indexed_descendants())
+
+    @classmethod
+    def is_descendant_of(cls, ancestor):
+        descendant = ancestor.root()._pre_order().is_descendant(cls, ancestor)
+        if descendant is None:  # cls appears more then once below the root, check through each parent
+            return any(parent is ancestor or parent.is_descendant_of(ancestor) for parent in cls.parents)
+        return descendant
 
     @classmethod
     def root(cls):
-        root = cls
-        while root.parent:
-            root = root.parent
-        return root
+        ancestors = cls._ancestors()
+        return ancestors[-1] if ancestors else cls
 
     @classmethod
     def ancestors(cls, ascending=False, include_self=False):
-        ancestors = []
+        ancestors = list(cls._ancestors())
         if include_self:
-            ancestors.append(cls)
-        parent = cls
-        while parent.parent:
-            parent = parent.parent
-            ancestors.append(parent)
+            ancestors.insert(0, cls)
 
         if not ascending:
-            ancestors = ancestors[::-1]
+            ancestors.reverse()
 
         return ancestors
 
+    @class_property
+    def depth(cls):
+        return len(cls._ancestors())
+
+    @staticmethod
+    def lca(a, b):
+        """Lowest common ancestor of a and b following primary parents, None if they have different roots"""
+        root = a.root()
+        if b.root() is not root:
+            return None
+        return root._lowest_common_ancestors()(a, b)
+
+    @staticmethod
+    def path(a, b):
+        """Fortnums from a to b through their lowest common ancestor, None if they have different roots"""
+        ancestor = Fortnum.lca(a, b)
+        if ancestor is None:
+            return None
+
+        up = ((a,) + a._ancestors())[:a.depth - ancestor.depth + 1]
+        down = ((b,) + b._ancestors())[:b.depth - ancestor.depth]
+        return list(up + down[::-1])
+
+    @staticmethod
+    def distance(a, b):
+        ancestor = Fortnum.lca(a, b)
+        if ancestor is None:
+            return None
+        return a.depth + b.depth - 2 * ancestor.depth
+
     @classmethod
     def family(cls):
-        for ancestor in cls.ancestors():
-            yield ancestor
+        return chain(cls.ancestors(), (cls,), cls.descendants())
+
+    @classmethod
+    def _ancestors(cls):
+        # A primary parent is never replaced, the cached ancestors are only outdated once the root gets a parent
+        ancestors = cls._tree_cache.get("_ancestors")
+        if ancestors is None or (ancestors[-1] if ancestors else cls).parent is not None:
+            ancestors = []
+            parent = cls.parent
+            while parent:
+                ancestors.append(parent)
+                parent = parent.parent
+            ancestors = cls._tree_cache["_ancestors"] = tuple(ancestors)
+        return ancestors
+
+    @classmethod
+    @tree_cached
+    def _indexed_descendants(cls):
+        descendants = OrderedDict.fromkeys(cls.descendants())
+        item_class = cls.item_class
+        return tuple(fortnum for fortnum in descendants if not item_class or issubclass(fortnum, item_class))
+
+    @classmethod
+    @tree_cached
+    def _attribute_index(cls, attribute, unique):
+        missing = object()
+        return AttributeIndex(
+            cls._indexed_descendants(), lambda fortnum: getattr(fortnum, attribute, missing), missing, unique
+        )
 
-        yield cls
+    @classmethod
+    @tree_cached
+    def _key_search(cls):
+        def keys(fortnum):
+            return [key.casefold() for key in chain((fortnum.serialize(),), fortnum.__dict__.get("aliases", ()))]
+        return KeySearch(tuple(OrderedDict.fromkeys(cls.descendants())), keys)
 
-        for descendant in cls.descendants():
-            yield descendant
+    @classmethod
+    @tree_cached
+    def _pre_order(cls):
+        return PreOrder(cls, lambda fortnum: fortnum.children.values())
+
+    @classmethod
+    @tree_cached
+    def _lowest_common_ancestors(cls):
+        return LowestCommonAncestors(
+            cls,
+            lambda fortnum: [child for child in fortnum.children.values() if child.parent is fortnum]
+        )
+
+
+def compile_tree(root):
+    """
+    Freeze every fortnum connected to root, through children or parents, and build their indexes.
+    A frozen fortnum can not be changed, so its cached indexes never have to be rebuilt.
+    """
+    fortnums = {root}
+    remaining = [root]
+    while remaining:
+        fortnum = remaining.pop()
+        for connected in chain(fortnum.children.values(), fortnum.parents):
+            if connected not in fortnums:
+                fortnums.add(connected)
+                remaining.append(connected)
+
+    for fortnum in fortnums:
+        if not fortnum.frozen:
+            fortnum._tree_cache.clear()
+            fortnum.children = MappingProxyType(fortnum.children)
+            fortnum.frozen = True
+
+    for fortnum in fortnums:
+        fortnum._ancestors()
+        if fortnum.parent is None:
+            fortnum._pre_order()
+            fortnum._lowest_common_ancestors()
+
+    return root
+
+
+class FortnumSet(Set):
+    """
+    Immutable set of children of parent, stored as an int with bit i set for the child at position i. Sets of
+    the same parent are combined with int operations, int(fortnum_set) and from_int convert to and from the mask.
+    """
+
+    __slots__ = ("parent", "mask")
+
+    def __init__(self, parent, fortnums=()):
+        mask = 0
+        for fortnum in fortnums:
+            mask |= 1 << parent.sort_key(fortnum)
+        self.parent = parent
+        self.mask = mask
+
+    @classmethod
+    def from_int(cls, parent, mask):
+        if mask < 0 or mask >> len(parent.children):
+            raise ValueError("%d is not a set of the %d children of '%s'." % (mask, len(parent.children), parent))
+        return cls._from_mask(parent, mask)
+
+    @classmethod
+    def _from_mask(cls, parent, mask):
+        fortnum_set = cls.__new__(cls)
+        fortnum_set.parent = parent
+        fortnum_set.mask = mask
+        return fortnum_set
+
+    def _from_iterable(self, iterable):
+        # Combined with other sets the result may hold more than children of parent, those are frozensets
+        fortnums = list(iterable)
+        parent = self.parent
+        if all(fortnum in parent for fortnum in fortnums):
+            return FortnumSet(parent, fortnums)
+        return frozenset(fortnums)
+
+    def _mask_of(self, other):
+        if isinstance(other, FortnumSet) and other.parent is self.parent:
+            return other.mask
+        return None
+
+    def __int__(self):
+        return self.mask
+
+    def __contains__(self, fortnum):
+        try:
+            index = fortnum.parent_index.get(self.parent)
+        except AttributeError:
+            return False
+        return index is not None and bool(self.mask >> index & 1)
+
+    def __iter__(self):
+        children = self.parent._children_by_code()
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            yield children[lowest.bit_length() - 1]
+            mask ^= lowest
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __bool__(self):
+        return bool(self.mask)
+
+    def __or__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__or__(other)
+        return FortnumSet._from_mask(self.parent, self.mask | mask)
+
+    def __and__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__and__(other)
+        return FortnumSet._from_mask(self.parent, self.mask & mask)
+
+    def __sub__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__sub__(other)
+        return FortnumSet._from_mask(self.parent, self.mask & ~mask)
+
+    def __xor__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__xor__(other)
+        return FortnumSet._from_mask(self.parent, self.mask ^ mask)
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __le__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__le__(other)
+        return not self.mask & ~mask
+
+    def __ge__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__ge__(other)
+        return not mask & ~self.mask
+
+    def __lt__(self, other):
+        return self <= other and self != other
+
+    def __gt__(self, other):
+        return self >= other and self != other
+
+    def __eq__(self, other):
+        mask = self._mask_of(other)
+        if mask is None:
+            return super().__eq__(other)
+        return self.mask == mask
+
+    def __hash__(self):
+        # Equal to the frozenset of the members, as they compare equal
+        return hash(frozenset(self))
+
+    def __repr__(self):
+        return "%s.Set(%s)" % (self.parent, ", ".join(map(str, self)))
 
 
 class FortnumDescriptor:
-    def __init__(self, attr, fortnum, default=None, allow_none=False):
+    """
+    Validates that only children of fortnum are assigned. Values are stored in the instance __dict__, or in
+    the instance slot named by slot, falling back to a WeakKeyDictionary when neither is available.
+
+    With coerce=True the serialized key or the code, the position among the children, of a child is accepted in
+    its place. With store_code=True the code of the child is stored instead of the child itself.
+    """
+
+    def __init__(self, attr, fortnum, default=None, allow_none=False, slot=None, coerce=False, store_code=False):
         self.values = WeakKeyDictionary()
         self.attr = attr
         self.fortnum = fortnum
         self.default = default
         self.allow_none = allow_none
+        self.slot = slot
+        self.coerce = coerce
+        self.store_code = store_code
+        self.name = None  # Set by __set_name__ when the owner instances have a __dict__
+
+    def __set_name__(self, owner, name):
+        if self.slot is None and owner.__dictoffset__:
+            self.name = name
 
     def __set__(self, instance, value):
         if value is None:
             if not self.allow_none and not self.default:
-                raise ValueError("None not allowed.")
+                raise InvalidFortnumValue(self, value)
 
-            if instance in self.values:
-                del self.values[instance]
+            self._discard(instance)
 
         else:
-            if value not in self.fortnum:
-                raise ValueError("'%s' is not a valid option for '%s'. Try %s" % (
-                    value,
-                    self.attr,
-                    list(self.fortnum)
-                ))
-            self.values[instance] = value
+            if self.coerce:
+                value = self._coerce(value)
+            elif value not in self.fortnum:
+                raise InvalidFortnumValue(self, value)
+
+            if self.store_code:
+                value = value.parent_index[self.fortnum]
+
+            if self.name is not None:
+                instance.__dict__[self.name] = value
+            elif self.slot is not None:
+                setattr(instance, self.slot, value)
+            else:
+                self.values[instance] = value
 
     def __get__(self, instance, owner):
+        if self.store_code:
+            return self._get_code(instance)
+
+        if self.name is not None and instance is not None:
+            return instance.__dict__.get(self.name, self.default)
+
+        if self.slot is not None and instance is not None:
+            return getattr(instance, self.slot, self.default)
+
         if instance in self.values:
             return self.values[instance]
         return self.default
+
+    def _get_code(self, instance):
+        if instance is None:
+            return self.default
+
+        if self.name is not None:
+            code = instance.__dict__.get(self.name)
+        elif self.slot is not None:
+            code = getattr(instance, self.slot, None)
+        else:
+            code = self.values.get(instance)
+
+        if code is None:
+            return self.default
+        return self.fortnum._children_by_code()[code]
+
+    def _coerce(self, value):
+        if _is_code(value):
+            child = self.fortnum._children_by_code().get(int(value))
+        else:
+            try:
+                child = self.fortnum._coercions().get(value)
+            except TypeError:  # Unhashable
+                child = None
+
+        if child is None:
+            raise InvalidFortnumValue(self, value)
+        return child
+
+    def _discard(self, instance):
+        if self.name is not None:
+            instance.__dict__.pop(self.name, None)
+        elif self.slot is not None:
+            if hasattr(instance, self.slot):
+                delattr(instance, self.slot)
+        elif instance in self.values:
+            del self.values[instance]
+
+    def validate_many(self, values):
+        """Validate all values at once, every invalid value is listed in the returned ValidationReport"""
+        if self.coerce:
+            members, codes = self.fortnum._coercions(), self.fortnum._children_by_code()
+        else:
+            members, codes = frozenset(self.fortnum.children.values()), {}
+        none_allowed = self.allow_none or bool(self.default)
+
+        invalid = []
+        index = -1
+        for index, value in enumerate(values):
+            if value is None:
+                if none_allowed:
+                    continue
+            else:
+                try:
+                    if value in members:
+                        continue
+                except TypeError:  # Unhashable
+                    pass
+                if codes and _is_code(value) and int(value) in codes:
+                    continue
+            invalid.append((index, value))
+
+        return ValidationReport(self, index + 1, invalid)
+
+    def _assign_many(self, instances, values):
+        # The values are already validated
+        if self.coerce:
+            coercions, codes = self.fortnum._coercions(), self.fortnum._children_by_code()
+            values = [
+                None if value is None else codes[int(value)] if _is_code(value) else coercions[value]
+                for value in values
+            ]
+        if self.store_code:
+            codes = self.fortnum._codes()
+            values = [None if value is None else codes[value] for value in values]
+
+        if self.name is not None:
+            name = self.name
+            for instance, value in zip(instances, values):
+                if value is None:
+                    instance.__dict__.pop(name, None)
+                else:
+                    instance.__dict__[name] = value
+        else:
+            for instance, value in zip(instances, values):
+                if value is None:
+                    self._discard(instance)
+                elif self.slot is not None:
+                    setattr(instance, self.slot, value)
+                else:
+                    self.values[instance] = value
+
+
+def _is_code(value):
+    # Only integers are codes, bool and values like 1.0 that merely equal one are not
+    return type(value) is int or isinstance(value, Integral) and not isinstance(value, bool)
+
+
+class ValidationReport(object):
+    """The invalid values found by FortnumDescriptor.validate_many, as (index, value) pairs"""
+
+    __slots__ = ("descriptor", "count", "invalid")
+
+    def __init__(self, descriptor, count, invalid):
+        self.descriptor = descriptor
+        self.count = count
+        self.invalid = invalid
+
+    @property
+    def valid(self):
+        return not self.invalid
+
+    def errors(self):
+        """(index, InvalidFortnumValue) for each invalid value"""
+        return [(index, InvalidFortnumValue(self.descriptor, value)) for index, value in self.invalid]
+
+    def __str__(self):
+        if not self.invalid:
+            return "All %d values of '%s' are valid." % (self.count, self.descriptor.attr)
+        return "%d of %d values of '%s' are invalid:\n%s" % (
+            len(self.invalid), self.count, self.descriptor.attr,
+            "\n".join("  %d: %s" % (index, error) for index, error in self.errors())
+        )
+
+
+def _find_descriptor(cls, field):
+    for klass in cls.__mro__:
+        if field in klass.__dict__:
+            descriptor = klass.__dict__[field]
+            if not isinstance(descriptor, FortnumDescriptor):
+                raise TypeError("'%s.%s' is not a FortnumDescriptor." % (cls.__name__, field))
+            return descriptor
+    raise AttributeError("'%s' has no field '%s'." % (cls.__name__, field))
+
+
+def bulk_assign(instances, field, values):
+    """
+    Assign values[i] to the FortnumDescriptor field of instances[i]. Every value is validated before anything is
+    assigned, a BulkValidationError lists all the invalid ones.
+    """
+    instances, values = list(instances), list(values)
+    if len(instances) != len(values):
+        raise ValueError("Got %d instances but %d values." % (len(instances), len(values)))
+
+    descriptors = {_find_descriptor(cls, field) for cls in set(map(type, instances))}
+    if len(descriptors) > 1:
+        raise TypeError("The instances do not share the FortnumDescriptor '%s'." % field)
+    if not descriptors:
+        return
+
+    descriptor, = descriptors
+    report = descriptor.validate_many(values)
+    if not report.valid:
+        raise BulkValidationError(report)
+    descriptor._assign_many(instances, values)
@@ -0,0 +1,182 @@
+"""
+Opt-in counters and latency histograms for the fortnum hot paths.
+
+enable() replaces the instrumented methods with timing wrappers and disable() puts the original methods back, so
+while disabled nothing is added to the hot path. Each call is recorded in stats, tagged by operation and by the root
+of the fortnum involved, and passed as an Event to every sink. A sink is any callable, LoggingSink logs the events.
+
+    from fortnum import instrumentation
+
+    instrumentation.enable(sinks=[instrumentation.LoggingSink()])
+    ...
+    print(instrumentation.stats.prometheus())
+"""
+import logging
+import threading
+from collections import namedtuple
+from functools import wraps
+from time import perf_counter
+
+from fortnum.fortnum import Fortnum, FortnumMeta, FortnumDescriptor
+
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+
+Event = namedtuple("Event", ("operation", "root", "seconds", "error"))
+
+
+class OperationStats(object):
+    __slots__ = ("count", "errors", "seconds", "buckets")
+
+    def __init__(self, size):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * size  # Calls per bucket, not cumulative
+
+
+class Stats(object):
+    """Count, errors, total time and latency histogram for each (operation, root)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        buckets = self.buckets
+        index = 0
+        while index < len(buckets) and event.seconds > buckets[index]:
+            index += 1
+
+        with self._lock:
+            stats = self.operations.get((event.operation, event.root))
+            if stats is None:
+                stats = self.operations[event.operation, event.root] = OperationStats(len(buckets) + 1)
+            stats.count += 1
+            stats.errors += event.error is not None
+            stats.seconds += event.seconds
+            stats.buckets[index] += 1
+
+    def prometheus(self, prefix="fortnum"):
+        """The stats in the Prometheus text exposition format"""
+        latency, errors = [], []
+        with self._lock:
+            operations = sorted(self.operations.items())
+            for (operation, root), stats in operations:
+                labels = 'operation="%s",root="%s"' % (_escape(operation), _escape(root))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), stats.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    latency.append('%s_operation_seconds_bucket{%s,le="%s"} %d' % (prefix, labels, le, cumulative))
+                latency.append("%s_operation_seconds_sum{%s} %r" % (prefix, labels, stats.seconds))
+                latency.append("%s_operation_seconds_count{%s} %d" % (prefix, labels, stats.count))
+                errors.append("%s_operation_errors_total{%s} %d" % (prefix, labels, stats.errors))
+
+        return "\n".join([
+            "# HELP %s_operation_seconds Latency of fortnum operations." % prefix,
+            "# TYPE %s_operation_seconds histogram" % prefix,
+        ] + latency + [
+            "# HELP %s_operation_errors_total Fortnum operations that raised." % prefix,
+            "# TYPE %s_operation_errors_total counter" % prefix,
+        ] + errors) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LoggingSink(object):
+    """Logs each event, errors at level WARNING"""
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger("fortnum")
+        self.level = level
+
+    def __call__(self, event):
+        if event.error is not None:
+            self.logger.warning("%s on '%s' raised %r after %.1f us",
+                                event.operation, event.root, event.error, event.seconds * 1e6)
+        elif self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s on '%s' took %.1f us", event.operation, event.root, event.seconds * 1e6)
+
+
+def _fortnum_root(fortnum, *args, **kwargs):
+    return fortnum.root()
+
+
+def _descriptor_root(descriptor, *args, **kwargs):
+    return descriptor.fortnum.root()
+
+
+# (operation, owner, attribute, root of the call)
+INSTRUMENTED = (
+    ("deserialize", Fortnum, "deserialize", _fortnum_root),
+    ("deserialize", Fortnum, "deserialize_many", _fortnum_root),
+    ("contains", FortnumMeta, "__contains__", _fortnum_root),
+    ("compare", FortnumMeta, "__lt__", _fortnum_root),
+    ("compare", FortnumMeta, "__le__", _fortnum_root),
+    ("compare", FortnumMeta, "__gt__", _fortnum_root),
+    ("compare", FortnumMeta, "__ge__", _fortnum_root),
+    ("traverse", Fortnum, "descendants", _fortnum_root),
+    ("traverse", Fortnum, "ancestors", _fortnum_root),
+    ("descriptor_get", FortnumDescriptor, "__get__", _descriptor_root),
+    ("descriptor_set", FortnumDescriptor, "__set__", _descriptor_root),
+)
+
+stats = Stats()
+_sinks = []
+_originals = {}  # (owner, attribute) of the replaced methods, while enabled
+
+
+def _wrap(operation, function, root):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        error = None
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            event = Event(operation, str(root(*args, **kwargs)), perf_counter() - start, error)
+            stats.record(event)
+            for sink in _sinks:
+                sink(event)
+    return wrapper
+
+
+def enable(sinks=(), buckets=None):
+    """Start recording, with a new stats if buckets are given"""
+    global stats
+    if buckets is not None:
+        stats = Stats(buckets)
+    _sinks[:] = sinks
+
+    for operation, owner, attribute, root in INSTRUMENTED:
+        if (owner, attribute) in _originals:
+            continue
+
+        original = _originals[owner, attribute] = owner.__dict__[attribute]
+        if isinstance(original, classmethod):
+            wrapped = classmethod(_wrap(operation, original.__func__, root))
+        else:
+            wrapped = _wrap(operation, original, root)
+        type.__setattr__(owner, attribute, wrapped)
+
+
+def disable():
+    """Stop recording and restore the original methods, stats are kept"""
+    while _originals:
+        (owner, attribute), original = _originals.popitem()
+        type.__setattr__(owner, attribute, original)
+
+
+def enabled():
+    return bool(_originals)
+
+
+def reset():
+    with stats._lock:
+        stats.operations.clear()
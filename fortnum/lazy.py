@@ -0,0 +1,125 @@
+"""
+Fortnum trees declared as data, a dict or a JSON or YAML document, instead of as class bodies.
+
+In a spec every mapping is a child, named by its key, and every other value is an attribute. With lazy=True only
+the root is created up front. The children of a fortnum are created the first time they are needed: when one of
+them is accessed as an attribute, or when the fortnum is iterated, deserialized from or traversed. Fortnum.lookup
+of a key declared in the spec creates only the fortnums on the path to it.
+"""
+import json
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import partial
+from weakref import ref
+
+from fortnum.fortnum import Fortnum, FortnumMeta
+
+
+class LazyMapping(Mapping):
+    """Stands in for the children or key_index of a lazy fortnum until its children are created"""
+
+    __slots__ = ("fortnum", "attribute")
+
+    def __init__(self, fortnum, attribute):
+        self.fortnum = fortnum
+        self.attribute = attribute
+
+    def _materialized(self):
+        materialize = self.fortnum.__dict__.get("_materialize")
+        if materialize is not None:
+            materialize()
+        return getattr(self.fortnum, self.attribute)
+
+    def __getitem__(self, key):
+        return self._materialized()[key]
+
+    def __iter__(self):
+        return iter(self._materialized())
+
+    def __len__(self):
+        return len(self._materialized())
+
+    def __contains__(self, key):
+        return key in self._materialized()
+
+    def keys(self):
+        return self._materialized().keys()
+
+    def values(self):
+        return self._materialized().values()
+
+    def items(self):
+        return self._materialized().items()
+
+
+class _Materialize(object):
+    """Creates the children of a lazy fortnum, keys are the keys they are declared as"""
+
+    __slots__ = ("fortnum", "children", "base", "keys")
+
+    def __init__(self, fortnum, children, base):
+        self.fortnum = fortnum
+        self.children = children
+        self.base = base
+        self.keys = frozenset(key for key, _ in children)
+
+    def __call__(self):
+        # Other threads wait for the lock in LazyMapping or FortnumMeta.__getattr__ until the children are published
+        fortnum = self.fortnum
+        with FortnumMeta._lock:
+            if "_materialize" not in fortnum.__dict__:
+                return
+
+            items = [(key, _tree_from_dict(key, spec, self.base, True)) for key, spec in self.children]
+            fortnum._add_children(OrderedDict(), {}, items)
+            del fortnum._materialize
+            FortnumMeta._lazy.discard(fortnum)
+
+
+def _index_keys(reference, spec):
+    # Each key declared below the root, with the path of keys leading to it as nested (path, key) pairs
+    lazy_keys = FortnumMeta._lazy_keys
+    remaining = [(None, spec)]
+    while remaining:
+        path, spec = remaining.pop()
+        for key, value in spec.items():
+            if isinstance(value, Mapping):
+                child_path = (path, key)
+                lazy_keys.setdefault(key, []).append((reference, child_path))
+                remaining.append((child_path, value))
+
+
+def tree_from_dict(name, spec, base=Fortnum, lazy=True):
+    with FortnumMeta._lock:
+        fortnum = _tree_from_dict(name, spec, base, lazy)
+        if lazy:
+            FortnumMeta._lazy_specs.append(partial(_index_keys, ref(fortnum), spec))
+    return fortnum
+
+
+def _tree_from_dict(name, spec, base, lazy):
+    attributes = {key: value for key, value in spec.items() if not isinstance(value, Mapping)}
+    children = [(key, value) for key, value in spec.items() if isinstance(value, Mapping)]
+
+    if not lazy or not children:
+        attributes.update((key, _tree_from_dict(key, child, base, lazy)) for key, child in children)
+        return base(name, **attributes)
+
+    fortnum = base(name, **attributes)
+    fortnum.children = LazyMapping(fortnum, "children")
+    fortnum.key_index = LazyMapping(fortnum, "key_index")
+    fortnum._materialize = _Materialize(fortnum, children, base)
+    FortnumMeta._lazy.add(fortnum)
+    return fortnum
+
+
+def tree_from_json(name, document, base=Fortnum, lazy=True):
+    """document is a JSON string or a file"""
+    spec = json.load(document) if hasattr(document, "read") else json.loads(document)
+    return tree_from_dict(name, spec, base, lazy)
+
+
+def tree_from_yaml(name, document, base=Fortnum, lazy=True):
+    """document is a YAML string or a file, requires PyYAML"""
+    import yaml
+    return tree_from_dict(name, yaml.safe_load(document), base, lazy)
@@ -0,0 +1,262 @@
+"""
+Binary snapshots of whole fortnum trees.
+
+dump_tree writes a root and all its descendants, with their declared attributes, the order of their children,
+the parents they have within the tree and their related fortnum edges. load_tree creates every class with its
+children, parents, indexes and related fortnums filled in and registers them once all are complete, without
+replaying FortnumMeta.__new__.
+
+The snapshot is a short header followed by two pickles. The first holds the structure of the tree: the name,
+module, bases and declared attributes of each fortnum, listed so that children come before their parents, and
+the positions of their children. The second holds the attributes that may refer to fortnums of the tree and the
+related fortnum edges, in which fortnums of the tree are written as their position. Only load snapshots from
+trusted sources.
+"""
+import gc
+import io
+import pickle
+import struct
+from array import array
+from collections import OrderedDict
+from itertools import chain
+
+from fortnum.fortnum import FortnumMeta, METACLASS_ATTRIBUTES, register_related_fortnums
+from fortnum.utils import OrderedSet, RelatedFortnums
+
+MAGIC = b"FTNM"
+VERSION = 2
+_HEADER = struct.Struct("<4sH")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+_PLAIN_TYPES = frozenset((str, bytes, int, float, complex, bool, type(None)))
+_PICKLE_ERRORS = (pickle.PicklingError, TypeError, AttributeError, RecursionError)
+
+
+class _Pickler(pickle.Pickler):
+    # Fortnums of the tree are written as their position, they are created before the attributes are loaded
+
+    def __init__(self, file, positions):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.positions = positions
+
+    def persistent_id(self, obj):
+        if isinstance(obj, FortnumMeta):
+            return self.positions.get(obj)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, fortnums):
+        super().__init__(file)
+        self.fortnums = fortnums
+
+    def persistent_load(self, position):
+        return self.fortnums[position]
+
+
+def _post_order(root):
+    # Every fortnum below root once, each one after all of its children
+    fortnums = []
+    seen = {root}
+    stack = [(root, iter(root.children.values()))]
+    while stack:
+        fortnum, children = stack[-1]
+        for child in children:
+            if child not in seen:
+                seen.add(child)
+                stack.append((child, iter(child.children.values())))
+                break
+        else:
+            stack.pop()
+            fortnums.append(fortnum)
+    return fortnums
+
+
+def _declared_attributes(fortnum):
+    attributes = {}
+    children = fortnum.children
+    for key, value in vars(fortnum).items():
+        if key in METACLASS_ATTRIBUTES or key in children or isinstance(value, RelatedFortnums):
+            continue
+        if key in ("__module__", "__dict__", "__weakref__") or key == "__doc__" and value is None:
+            continue
+        if key == "abstract" and value is False:
+            continue
+        attributes[key] = value
+    return attributes
+
+
+def _is_plain(value, positions):
+    # Whether value can be loaded before the fortnums of the tree exist, anything unknown might refer to them
+    remaining = [value]
+    while remaining:
+        value = remaining.pop()
+        if type(value) in _PLAIN_TYPES:
+            continue
+        if type(value) in (tuple, list, set, frozenset):
+            remaining.extend(value)
+        elif type(value) is dict:
+            remaining.extend(chain(value.keys(), value.values()))
+        elif not isinstance(value, FortnumMeta) or value in positions:
+            return False
+    return True
+
+
+def _array(values):
+    # Unsigned integers in the smallest array type that holds them
+    values = list(values)
+    largest = max(values, default=0)
+    return array("B" if largest < 0x100 else "H" if largest < 0x10000 else "I", values)
+
+
+def _table(values):
+    # The distinct values and the position of each value among them
+    positions = OrderedDict()
+    indexes = _array([positions.setdefault(value, len(positions)) for value in values])
+    return list(positions), indexes
+
+
+def dump_tree(root, fp):
+    fortnums = _post_order(root)
+    positions = {fortnum: position for position, fortnum in enumerate(fortnums)}
+
+    for fortnum in fortnums:
+        for base in fortnum.__bases__:
+            if base in positions:
+                raise SnapshotError("Unable to snapshot '%s', '%s' is the base of '%s'." % (root, base, fortnum))
+
+    child_counts, child_positions, child_keys, parents, edges = [], [], [], {}, []
+    attributes, linked = [], {}
+    for fortnum in fortnums:
+        declared = _declared_attributes(fortnum)
+        attributes.append({key: value for key, value in declared.items() if _is_plain(value, positions)})
+        if len(attributes[-1]) < len(declared):
+            linked[positions[fortnum]] = {key: value for key, value in declared.items() if key not in attributes[-1]}
+
+        child_counts.append(len(fortnum.children))
+        for key, child in fortnum.children.items():
+            child_positions.append(positions[child])
+            child_keys.append(None if key == child.__name__ else key)
+
+        in_tree = [positions[parent] for parent in fortnum.parents if parent in positions]
+        if len(in_tree) > 1:
+            parents[positions[fortnum]] = in_tree
+
+        # The sources within the tree in the order of the related set, and the targets outside of the tree
+        for related_name, related_fortnums in vars(fortnum).items():
+            if isinstance(related_fortnums, RelatedFortnums):
+                edges.extend((source, related_name, fortnum) for source in related_fortnums if source in positions)
+        for related_name, targets in fortnum._related_targets.items():
+            edges.extend((fortnum, related_name, target) for target in targets if target not in positions)
+
+    modules, module_of = _table(fortnum.__module__ for fortnum in fortnums)
+    bases, base_of = _table(fortnum.__bases__ for fortnum in fortnums)
+    structure = (
+        [fortnum.__name__ for fortnum in fortnums],
+        [None if fortnum.__qualname__ == fortnum.__name__ else fortnum.__qualname__ for fortnum in fortnums],
+        modules, module_of, bases, base_of, attributes, _array(child_counts), _array(child_positions), child_keys,
+        parents
+    )
+
+    # Pickled in memory first, nothing is written to fp unless the whole tree can be pickled
+    buffer = io.BytesIO()
+    try:
+        pickle.dump(structure, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        _Pickler(buffer, positions).dump((linked, edges))
+    except _PICKLE_ERRORS as error:
+        raise _pickle_error(root, fortnums, positions, error) from error
+
+    fp.write(_HEADER.pack(MAGIC, VERSION))
+    fp.write(buffer.getbuffer())
+
+
+def _pickle_error(root, fortnums, positions, error):
+    # Names the first declared attribute that can not be pickled, found by pickling each of them on its own
+    for fortnum in fortnums:
+        for key, value in _declared_attributes(fortnum).items():
+            try:
+                _Pickler(io.BytesIO(), positions).dump(value)
+            except RecursionError:
+                return SnapshotError("Unable to snapshot '%s', the value of '%s.%s' is nested too deeply to pickle." % (
+                    root, fortnum, key
+                ))
+            except _PICKLE_ERRORS as attribute_error:
+                return SnapshotError("Unable to snapshot '%s', the value of '%s.%s' can not be pickled: %s" % (
+                    root, fortnum, key, attribute_error
+                ))
+    return SnapshotError("Unable to snapshot '%s': %s" % (root, error))
+
+
+def load_tree(fp):
+    magic, version = _HEADER.unpack(fp.read(_HEADER.size))
+    if magic != MAGIC:
+        raise SnapshotError("Not a fortnum snapshot.")
+    if version != VERSION:
+        raise SnapshotError("Unsupported snapshot version %d, expected %d." % (version, VERSION))
+
+    # Nothing created here is garbage, collecting while the classes are created only slows loading large trees
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _load_tree(fp)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _load_tree(fp):
+    names, qualnames, modules, module_of, bases, base_of, attributes, child_counts, child_positions, child_keys, \
+        parents = pickle.load(fp)
+
+    # The fortnums are not visible to other threads until they are registered, so they are filled in place
+    with FortnumMeta._lock:
+        fortnums = []
+        start = 0
+        for position, name in enumerate(names):
+            children = OrderedDict()
+            for index in range(start, start + child_counts[position]):
+                child, key = fortnums[child_positions[index]], child_keys[index]
+                children[child.__name__ if key is None else key] = child
+            start += child_counts[position]
+
+            namespace = dict(children, __module__=modules[module_of[position]])
+            namespace.update(attributes[position])
+            if qualnames[position] is not None:
+                namespace["__qualname__"] = qualnames[position]
+            namespace = FortnumMeta._class_attributes(namespace)
+            fortnum = type.__new__(FortnumMeta, name, bases[base_of[position]], namespace)
+            fortnum.children.update(children)
+            fortnums.append(fortnum)
+
+        linked, edges = _Unpickler(fp, fortnums).load()
+        for position, declared in linked.items():
+            for key, value in declared.items():
+                type.__setattr__(fortnums[position], key, value)
+
+        # Parents are listed after their children, so each child gets its parents in the order they are listed
+        for fortnum in fortnums:
+            key_index, alias_index, normalize = fortnum.key_index, fortnum.alias_index, fortnum.normalize
+            for index, child in enumerate(fortnum.children.values()):
+                key_index[child.serialize()] = child
+                if normalize is not None or "aliases" in child.__dict__:
+                    fortnum._index_aliases(alias_index, child)
+                child.parent_index[fortnum] = index
+                child.parents.add(fortnum)
+
+        # Fortnums with more then one parent get them in their original order, the first is the primary parent
+        for position, parent_positions in parents.items():
+            fortnum = fortnums[position]
+            type.__setattr__(fortnum, "parents", OrderedSet(fortnums[parent] for parent in parent_positions))
+        for fortnum in fortnums:
+            if fortnum.parents:
+                type.__setattr__(fortnum, "parent", next(iter(fortnum.parents)))
+
+        register_related_fortnums(edges)
+        for fortnum in fortnums:
+            fortnum._register()
+
+    return fortnums[-1]
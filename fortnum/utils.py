@@ -1,28 +1,20 @@
-import collections
-from weakref import proxy
+import collections.abc
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+from itertools import chain
 
 
-class Link(object):
-    __slots__ = 'prev', 'next', 'key', '__weakref__'
-
-
-class OrderedSet(collections.MutableSet):
+class OrderedSet(collections.abc.MutableSet):
     """Set the remembers the order elements were added"""
 
-    # Big-O running times for all methods are the same as for regular sets.
-    # The internal self.__map dictionary maps keys to links in a doubly linked list.
-    # The circular doubly linked list starts and ends with a sentinel element.
-    # The sentinel element never gets deleted (this simplifies the algorithm).
-    # The prev/next links are weakref proxies (to prevent circular references).
-    # Individual links are kept alive by the hard reference in self.__map.
-    # Those hard references disappear when a key is deleted from an OrderedSet.
+    # The elements are stored as the keys of a dict, dicts preserve insertion order.
+    # Comparing with anything but another OrderedSet is true if the two share at least one element,
+    # an odd definition of equality that is kept for backwards compatibility.
+
+    __slots__ = ('__map', '__weakref__')
 
     def __init__(self, iterable=None):
-        self.__root = root = Link()  # sentinel node for doubly linked list
-        root.prev = root.next = root
-        self.__map = {}  # key --> link
-        if iterable is not None:
-            self |= iterable
+        self.__map = {} if iterable is None else dict.fromkeys(iterable)
 
     def __len__(self):
         return len(self.__map)
@@ -31,43 +23,24 @@ class OrderedSet(collections.MutableSet):
         return key in self.__map
 
     def add(self, key):
-        # Store new key in a new link at the end of the linked list
-        if key not in self.__map:
-            self.__map[key] = link = Link()
-            root = self.__root
-            last = root.prev
-            link.prev, link.next, link.key = last, root, key
-            last.next = root.prev = proxy(link)
+        self.__map[key] = None
 
     def discard(self, key):
-        # Remove an existing item using self.__map to find the link which is
-        # then removed by updating the links in the predecessor and successors.
-        if key in self.__map:
-            link = self.__map.pop(key)
-            link.prev.next = link.next
-            link.next.prev = link.prev
+        self.__map.pop(key, None)
 
     def __iter__(self):
-        # Traverse the linked list in order.
-        root = self.__root
-        curr = root.next
-        while curr is not root:
-            yield curr.key
-            curr = curr.next
+        return iter(self.__map)
 
     def __reversed__(self):
-        # Traverse the linked list in reverse order.
-        root = self.__root
-        curr = root.prev
-        while curr is not root:
-            yield curr.key
-            curr = curr.prev
+        return reversed(self.__map)
 
     def pop(self, last=True):
         if not self:
             raise KeyError('set is empty')
-        key = next(reversed(self)) if last else next(iter(self))
-        self.discard(key)
+        if last:
+            return self.__map.popitem()[0]
+        key = next(iter(self.__map))
+        del self.__map[key]
         return key
 
     def __repr__(self):
@@ -81,5 +54,246 @@ class OrderedSet(collections.MutableSet):
         return not self.isdisjoint(other)
 
 
+class PreOrder(object):
+    """Pre-order listing of all nodes below root, with the span of the listing each node covers"""
+
+    # A node reachable through more then one path is listed once per path, exactly as a recursive
+    # pre-order traversal would list it. enter and exit hold the span of its first occurrence.
+
+    __slots__ = ('nodes', 'enter', 'exit', 'repeated')
+
+    def __init__(self, root, children):
+        nodes = [root]
+        enter = {root: 0}
+        exit = {}
+        repeated = set()
+
+        stack = [(root, iter(children(root)))]
+        while stack:
+            node, remaining = stack[-1]
+            for child in remaining:
+                if child in enter:
+                    repeated.add(child)
+                else:
+                    enter[child] = len(nodes)
+                nodes.append(child)
+                stack.append((child, iter(children(child))))
+                break
+            else:
+                stack.pop()
+                exit.setdefault(node, len(nodes))
+
+        self.nodes = tuple(nodes)
+        self.enter = enter
+        self.exit = exit
+        self.repeated = frozenset(repeated)
+
+    def subtree(self, node, include_self=False):
+        enter = self.enter[node]
+        return self.nodes[enter if include_self else enter + 1:self.exit[node]]
+
+    def is_descendant(self, node, ancestor):
+        """Whether node is below ancestor, None if node is repeated and it can not be told from the spans"""
+        enter = self.enter.get(node)
+        if enter is None:
+            return False
+        if node in self.repeated:
+            return None
+        return self.enter[ancestor] < enter < self.exit[ancestor]
+
+
+class LowestCommonAncestors(object):
+    """Lowest common ancestor of two nodes in a tree in constant time, using a sparse table over an Euler tour"""
+
+    # tour lists the nodes in the order they are visited, returning to the parent after each child, and
+    # table[k][i] holds the shallowest node of tour[i:i + 2 ** k]. The lowest common ancestor of a and b is the
+    # shallowest node in the tour between their first visits.
+
+    __slots__ = ('depth', 'first', 'table')
+
+    def __init__(self, root, children):
+        depth = {root: 0}
+        first = {root: 0}
+        tour = [root]
+
+        stack = [(root, iter(children(root)))]
+        while stack:
+            node, remaining = stack[-1]
+            for child in remaining:
+                depth[child] = depth[node] + 1
+                first[child] = len(tour)
+                tour.append(child)
+                stack.append((child, iter(children(child))))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    tour.append(stack[-1][0])
+
+        table = [tour]
+        span = 1
+        while span * 2 <= len(tour):
+            previous = table[-1]
+            table.append([a if depth[a] <= depth[b] else b for a, b in zip(previous, previous[span:])])
+            span *= 2
+
+        self.depth = depth
+        self.first = first
+        self.table = table
+
+    def __call__(self, a, b):
+        start, end = sorted((self.first[a], self.first[b]))
+        level = (end - start + 1).bit_length() - 1
+        a = self.table[level][start]
+        b = self.table[level][end - (1 << level) + 1]
+        return a if self.depth[a] <= self.depth[b] else b
+
+
+class KeySearch(object):
+    """Prefix and edit distance search over the keys of nodes, the found nodes are returned in the given order"""
+
+    # keys is sorted with positions[i] the position in nodes of the node with keys[i], so the keys starting
+    # with a prefix are a slice. blocks[j] holds the lowest distinct positions in positions[j * BLOCK:][:BLOCK],
+    # so for a short prefix matching most keys only the ends of the slice are searched one by one.
+    # The trie for edit distance search is built the first time it is needed.
+
+    BLOCK = 256
+    BLOCK_LIMIT = 32
+
+    __slots__ = ('nodes', 'keys', 'positions', 'blocks', 'trie')
+
+    def __init__(self, nodes, keys):
+        entries = sorted((key, position) for position, node in enumerate(nodes) for key in keys(node))
+        self.nodes = nodes
+        self.keys = [key for key, _ in entries]
+        self.positions = positions = [position for _, position in entries]
+        self.blocks = [
+            sorted(set(positions[start:start + self.BLOCK]))[:self.BLOCK_LIMIT]
+            for start in range(0, len(positions), self.BLOCK)
+        ]
+        self.trie = None
+
+    def prefix(self, prefix, limit=None):
+        start = bisect_left(self.keys, prefix)
+        stop = bisect_left(self.keys, prefix + '\U0010ffff', start)  # Past every key starting with prefix
+
+        block = self.BLOCK
+        if limit is None or limit > self.BLOCK_LIMIT or stop - start <= 2 * block:
+            return self._nodes(self.positions[start:stop], limit)
+
+        first, last = -(-start // block), stop // block  # The blocks within the slice
+        return self._nodes(chain(
+            self.positions[start:first * block], self.positions[last * block:stop], *self.blocks[first:last]
+        ), limit)
+
+    def within(self, key, distance, limit=None):
+        """Nodes with a key at most distance single character insertions, deletions or substitutions from key"""
+        if self.trie is None:
+            self.trie = self._build_trie()
+
+        # Depth first through the trie, with the row of the Levenshtein matrix for the key of each trie node
+        positions = []
+        stack = [(self.trie, list(range(len(key) + 1)))]
+        while stack:
+            node, row = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    continue
+                next_row = [row[0] + 1]
+                for index, key_char in enumerate(key, 1):
+                    next_row.append(min(next_row[-1] + 1, row[index] + 1, row[index - 1] + (key_char != char)))
+                if next_row[-1] <= distance and None in child:
+                    positions.extend(child[None])
+                if min(next_row) <= distance:
+                    stack.append((child, next_row))
+        return self._nodes(positions, limit)
+
+    def _build_trie(self):
+        trie = {}
+        for key, position in zip(self.keys, self.positions):
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(position)
+        return trie
+
+    def _nodes(self, positions, limit):
+        positions = set(positions)
+        positions = sorted(positions) if limit is None else nsmallest(limit, positions)
+        nodes = self.nodes
+        return [nodes[position] for position in positions]
+
+
+class AttributeIndex(object):
+    """Nodes by the value of an attribute, found nodes are returned in the given order"""
+
+    # hashed maps each hashable value to the positions of its nodes. For range lookups the values other than
+    # None are sorted the first time one is made, sorted_positions[i] is the position of sorted_values[i].
+
+    LOOKUPS = frozenset(("exact", "in", "gt", "gte", "lt", "lte"))
+
+    __slots__ = ('nodes', 'unique', 'hashed', 'entries', 'sorted_values', 'sorted_positions')
+
+    def __init__(self, nodes, value_of, missing, unique=False):
+        hashed = {}
+        entries = []
+        for position, node in enumerate(nodes):
+            value = value_of(node)
+            if value is missing:
+                continue
+            try:
+                hashed.setdefault(value, []).append(position)
+            except TypeError:  # Unhashable, only found by range lookups
+                pass
+            if value is not None:
+                entries.append((value, position))
+
+        if unique:
+            shared = [value for value, positions in hashed.items() if len(positions) > 1]
+            if shared:
+                raise ValueError("The values %s are shared by more then one node." % shared)
+
+        self.nodes = nodes
+        self.unique = unique
+        self.hashed = hashed
+        self.entries = entries
+        self.sorted_values = self.sorted_positions = None
+
+    def get(self, value, default=None):
+        """The node with value if unique, else a list of all nodes with value"""
+        positions = self.hashed.get(value, ())
+        if self.unique:
+            return self.nodes[positions[0]] if positions else default
+        return [self.nodes[position] for position in positions]
+
+    def positions(self, lookup, value):
+        """Positions of the nodes with a value matching lookup, one of LOOKUPS"""
+        if lookup == "exact":
+            return self.hashed.get(value, ())
+        if lookup == "in":
+            return list(chain.from_iterable(self.hashed.get(item, ()) for item in value))
+
+        if self.sorted_values is None:
+            self._sort()
+        values, positions = self.sorted_values, self.sorted_positions
+        if lookup == "gt":
+            return positions[bisect_right(values, value):]
+        if lookup == "gte":
+            return positions[bisect_left(values, value):]
+        if lookup == "lt":
+            return positions[:bisect_left(values, value)]
+        if lookup == "lte":
+            return positions[:bisect_right(values, value)]
+        raise ValueError("Unknown lookup '%s', use one of %s." % (lookup, sorted(self.LOOKUPS)))
+
+    def _sort(self):
+        try:
+            entries = sorted(self.entries, key=lambda entry: entry[0])
+        except TypeError:
+            raise TypeError("The values can not be ordered, only exact and in lookups are supported.")
+        self.sorted_positions = [position for _, position in entries]
+        self.sorted_values = [value for value, _ in entries]  # Set last, marks the sorted index as complete
+
+
 class RelatedFortnums(OrderedSet):
-    pass
+    __slots__ = ()
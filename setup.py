@@ -19,6 +19,7 @@ setup(
     license='MIT',
     packages=find_packages(exclude=['tests']),
     zip_safe=False,
+    python_requires='>=3.8',
     install_requires=[],
     include_package_data=True,
     classifiers=[
@@ -28,9 +29,11 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
         'Programming Language :: Python :: Implementation :: PyPy',
     ]
 )
\ No newline at end of file
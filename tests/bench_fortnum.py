@@ -0,0 +1,18 @@
+"""
+The fortnum.bench.suite cases for pytest-benchmark, run with
+
+    pytest tests/bench_fortnum.py --benchmark-autosave
+    pytest tests/bench_fortnum.py --benchmark-compare --benchmark-compare-fail=min:20%
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fortnum.bench.suite import CASES, SIZES  # noqa: E402
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_bench(benchmark, case, size):
+    benchmark.group = case
+    benchmark(CASES[case](size))
@@ -0,0 +1,47 @@
+import io
+from unittest import TestCase
+
+from fortnum.bench.suite import CASES, run, dump_results, load_results, compare
+from fortnum.fortnum import FortnumMeta
+
+
+class SuiteTestCase(TestCase):
+    def setUp(self):
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
+
+    def test_cases(self):
+        for name, case in CASES.items():
+            with self.subTest(case=name):
+                case(10)()
+
+    def test_run(self):
+        registry = FortnumMeta._registry
+        results = run([10], ["iterate"], repeat=1)
+        self.assertEqual([(result["case"], result["size"]) for result in results], [("iterate", 10)])
+        self.assertGreater(results[0]["seconds"], 0)
+        self.assertIs(FortnumMeta._registry, registry)
+
+    def test_results_round_trip(self):
+        results = [{"case": "iterate", "size": 10, "seconds": 1e-6}]
+        fp = io.StringIO()
+        dump_results(results, fp)
+        fp.seek(0)
+        self.assertEqual(load_results(fp), results)
+
+        with self.assertRaises(ValueError):
+            load_results(io.StringIO('{"format": 0, "results": []}'))
+
+    def test_compare(self):
+        baseline = [
+            {"case": "iterate", "size": 10, "seconds": 1.0},
+            {"case": "iterate", "size": 100, "seconds": 1.0},
+        ]
+        results = [
+            {"case": "iterate", "size": 10, "seconds": 1.1},
+            {"case": "iterate", "size": 100, "seconds": 1.5},
+            {"case": "sorted", "size": 10, "seconds": 1.0},
+        ]
+        self.assertEqual(list(compare(results, baseline, tolerance=0.2)), [
+            ("iterate", 10, 1.0, 1.1, False),
+            ("iterate", 100, 1.0, 1.5, True),
+        ])
@@ -1,13 +1,36 @@
-from collections import deque
-from unittest import TestCase
-
-from fortnum import Fortnum, class_property, FortnumDescriptor
-from fortnum.fortnum import FortnumMeta, UnableToAddRelatedFortnum, FortnumRelation
+import gc
+import sys
+import threading
+import weakref
+from array import array
+from collections import Counter, deque
+from fractions import Fraction
+from unittest import TestCase, skipUnless
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from fortnum import Fortnum, class_property, FortnumDescriptor, FrozenFortnum, AmbiguousFortnum, compile_tree, \
+    relations, InvalidFortnumValue, BulkValidationError, bulk_assign, FortnumSet, \
+    fold_key
+from fortnum.fortnum import FortnumMeta, UnableToAddRelatedFortnum, FortnumRelation, FortnumDoesNotExist
 
 
 class FortnumCase(TestCase):
     def setUp(self):
-        FortnumMeta._registry = {}  # Allow redeclaration between tests
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
 
     def testIn(self):
         child3 = Fortnum
@@ -20,6 +43,28 @@ class FortnumCase(TestCase):
         self.assertIn(Parent.child2, Parent)
         self.assertNotIn(child3, Parent)
 
+    def test_in_not_fortnum(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+
+        self.assertNotIn("Child1", Parent)
+        self.assertNotIn({}, Parent)
+        self.assertNotIn(None, Parent)
+
+    def test_contains_deep(self):
+        class GrandParent(Fortnum):
+            class Parent(Fortnum):
+                Child = Fortnum("Child")
+
+        self.assertFalse(GrandParent.contains(GrandParent.Parent.Child))
+        self.assertTrue(GrandParent.contains(GrandParent.Parent.Child, deep=True))
+        self.assertFalse(GrandParent.contains(GrandParent, deep=True))
+        self.assertFalse(GrandParent.contains({}, deep=True))
+
+        child2 = Fortnum("Child2")
+        GrandParent.Parent.add_child("Child2", child2)
+        self.assertTrue(GrandParent.contains(child2, deep=True))
+
     def testDict(self):
         class Fortnum1(Fortnum):
             pass
@@ -107,6 +152,178 @@ class FortnumCase(TestCase):
         ):
             self.assertEqual(descendant, descendants.popleft())
 
+    def test_descendants_include_self(self):
+        class Parent(Fortnum):
+            Child1 = Fortnum("Child1")
+            Child2 = Fortnum("Child2")
+
+        self.assertEqual(list(Parent.descendants(include_self=True)), [Parent, Parent.Child1, Parent.Child2])
+        self.assertEqual(list(Parent.Child1.descendants(include_self=True)), [Parent.Child1])
+        self.assertEqual(list(Parent.Child1.descendants()), [])
+
+    def test_descendants_shared_child(self):
+        shared = Fortnum("Shared")
+
+        class GrandParent(Fortnum):
+            class Parent1(Fortnum):
+                Shared = shared
+
+            class Parent2(Fortnum):
+                Shared = shared
+
+        self.assertEqual(
+            list(GrandParent.descendants()),
+            [GrandParent.Parent1, shared, GrandParent.Parent2, shared]
+        )
+        self.assertTrue(shared.is_descendant_of(GrandParent))
+        self.assertTrue(shared.is_descendant_of(GrandParent.Parent2))
+        self.assertFalse(GrandParent.Parent1.is_descendant_of(GrandParent.Parent2))
+
+    def test_descendants_after_add_child(self):
+        class GrandParent(Fortnum):
+            class Parent(Fortnum):
+                Child1 = Fortnum("Child1")
+
+        self.assertEqual(list(GrandParent.descendants()), [GrandParent.Parent, GrandParent.Parent.Child1])
+
+        child2 = Fortnum("Child2")
+        GrandParent.Parent.add_child("Child2", child2)
+        self.assertEqual(
+            list(GrandParent.descendants()),
+            [GrandParent.Parent, GrandParent.Parent.Child1, child2]
+        )
+        self.assertEqual(child2.ancestors(), [GrandParent, GrandParent.Parent])
+
+    def test_tree_cache_per_tree(self):
+        class GrandParent(Fortnum):
+            class Parent1(Fortnum):
+                Child = Fortnum("Child")
+
+            class Parent2(Fortnum):
+                Child = Fortnum("Child")
+
+        pre_order = GrandParent._pre_order()
+        parent1, parent2 = GrandParent.Parent1._pre_order(), GrandParent.Parent2._pre_order()
+
+        # Other trees changing leave the cached values alone
+        Fortnum("Other", child=Fortnum("Child")).add_child("child2", Fortnum("Child2"))
+        self.assertIs(GrandParent._pre_order(), pre_order)
+        self.assertIs(GrandParent.Parent1._pre_order(), parent1)
+
+        # Within the tree only those above the new child are invalidated
+        GrandParent.Parent1.add_child("Child2", Fortnum("Child2"))
+        self.assertIsNot(GrandParent._pre_order(), pre_order)
+        self.assertIsNot(GrandParent.Parent1._pre_order(), parent1)
+        self.assertIs(GrandParent.Parent2._pre_order(), parent2)
+        self.assertEqual(
+            list(GrandParent.Parent1.descendants()),
+            [GrandParent.Parent1.Child, GrandParent.Parent1.Child2]
+        )
+
+        # A root getting a parent updates the ancestors of the whole tree
+        self.assertEqual(GrandParent.Parent1.Child.depth, 2)
+        Fortnum("Root", grand_parent=GrandParent)
+        self.assertEqual(GrandParent.Parent1.Child.depth, 3)
+        self.assertEqual(GrandParent.Parent1.Child.root().serialize(), "Root")
+
+    def test_descendants_share_root_listing(self):
+        class GrandParent(Fortnum):
+            class Parent1(Fortnum):
+                Child = Fortnum("Child")
+
+            class Parent2(Fortnum):
+                Child = Fortnum("Child")
+
+        fortnums = list(GrandParent.descendants(include_self=True))
+        for fortnum in fortnums:
+            list(fortnum.descendants())
+            fortnum.is_descendant_of(GrandParent.Parent1)
+
+        # Subtrees are slices of the listing of the root, no other fortnum builds its own
+        self.assertEqual([fortnum for fortnum in fortnums if "_pre_order" in fortnum._tree_cache], [GrandParent])
+        self.assertEqual(list(GrandParent.Parent2.descendants()), [GrandParent.Parent2.Child])
+
+    def test_is_descendant_of(self):
+        class GrandParent(Fortnum):
+            class Parent(Fortnum):
+                Child = Fortnum("Child")
+
+        class Other(Fortnum):
+            Child = Fortnum("Child")
+
+        self.assertTrue(GrandParent.Parent.Child.is_descendant_of(GrandParent))
+        self.assertTrue(GrandParent.Parent.is_descendant_of(GrandParent))
+        self.assertFalse(GrandParent.is_descendant_of(GrandParent))
+        self.assertFalse(GrandParent.is_descendant_of(GrandParent.Parent))
+        self.assertFalse(Other.Child.is_descendant_of(GrandParent))
+
+    def test_encode(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+            child3 = Fortnum("Child3")
+
+        codes = Parent.encode([Parent.child3, Parent.child1, Parent.child3])
+        self.assertEqual(codes, array("H", [2, 0, 2]))
+        self.assertEqual(Parent.decode(codes), [Parent.child3, Parent.child1, Parent.child3])
+
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.encode([Parent])
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.decode([3])
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.decode([-1])
+
+    @skipUnless(numpy, "NumPy is not installed")
+    def test_encode_numpy(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        values = numpy.empty(3, dtype=object)
+        for index, value in enumerate([Parent.child2, Parent.child1, Parent.child2]):
+            values[index] = value  # Assigned one by one since fortnums look like sequences to NumPy
+        codes = Parent.encode(values)
+        self.assertEqual(codes.dtype, numpy.uint16)
+        self.assertEqual(codes.tolist(), [1, 0, 1])
+        self.assertEqual(Parent.decode(codes).tolist(), [Parent.child2, Parent.child1, Parent.child2])
+
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.decode(numpy.array([2]))
+
+    @skipUnless(pandas, "pandas is not installed")
+    def test_pandas_categorical(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        values = [Parent.child2, None, Parent.child1]
+        categorical = Parent.to_categorical(values, ordered=True)
+        self.assertEqual(list(categorical.categories), ["Child1", "Child2"])
+        self.assertTrue(categorical.ordered)
+        self.assertEqual(categorical.codes.tolist(), [1, -1, 0])
+        self.assertEqual(Parent.from_categorical(categorical), values)
+        self.assertEqual(Parent.from_categorical(pandas.Series(categorical)), values)
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_pyarrow_categorical(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        values = [Parent.child2, None, Parent.child1]
+        dictionary_array = Parent.to_categorical(values, library="pyarrow")
+        self.assertEqual(dictionary_array.dictionary.to_pylist(), ["Child1", "Child2"])
+        self.assertEqual(dictionary_array.indices.to_pylist(), [1, None, 0])
+        self.assertEqual(Parent.from_categorical(dictionary_array), values)
+
+    def test_categorical_unknown_library(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+
+        with self.assertRaises(ValueError):
+            Parent.to_categorical([Parent.child1], library="polars")
+
     def test_fortnum_property(self):
         class Fortnum1(Fortnum):
             @class_property
@@ -175,6 +392,32 @@ class FortnumCase(TestCase):
         self.assertEqual(list(Fruits.kiwi.persons), [])
         self.assertEqual(list(Fruits.kiwi.hated_by), [John, Jane])
 
+    def test_relation_registry(self):
+        class Fruits(Fortnum):
+            banana = Fortnum("Banana")
+            apple = Fortnum("Apple")
+            orange = Fortnum("Orange")
+            kiwi = Fortnum("Kiwi")
+
+        class Person(Fortnum):
+            related_name = "persons"
+
+        class John(Person):
+            favorite_fruits = FortnumRelation(Fruits.banana, Fruits.orange)
+            hated_fruits = FortnumRelation(Fruits.kiwi, related_name="hated_by")
+
+        class Jane(Person):
+            favorite_fruites = FortnumRelation(Fruits.apple, Fruits.orange)
+
+        self.assertEqual(relations.related_to_any("persons", [Fruits.banana, Fruits.apple]), {John, Jane})
+        self.assertEqual(relations.related_to_any("persons", [Fruits.kiwi]), frozenset())
+        self.assertEqual(relations.related_to_all("persons", [Fruits.banana, Fruits.orange]), {John})
+        self.assertEqual(relations.related_to_all("persons", [Fruits.banana, Fruits.apple]), frozenset())
+        self.assertEqual(relations.related_to_all("persons", []), frozenset())
+        self.assertEqual(relations.targets_of([John], "persons"), {Fruits.banana, Fruits.orange})
+        self.assertEqual(relations.targets_of([John, Jane], "hated_by"), {Fruits.kiwi})
+        self.assertIsInstance(relations.related_to_any("persons", [Fruits.orange]), frozenset)
+
     def test_unable_to_set_relation(self):
         class PhysicalState(Fortnum):
             chemicals = "not a FortnumRelation"
@@ -224,6 +467,44 @@ class FortnumCase(TestCase):
         self.assertTrue(Parent.child1 < Parent.child3)
         self.assertFalse(Parent.child3 < Parent.child2)
 
+    def test_larger_or_equal_then(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        self.assertTrue(Parent.child2 >= Parent.child1)
+        self.assertTrue(Parent.child2 >= Parent.child2)
+        self.assertFalse(Parent.child1 >= Parent.child2)
+        self.assertTrue(Parent.child1 <= Parent.child1)
+        self.assertFalse(Parent.child2 <= Parent.child1)
+
+    def test_sort_key(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+            child3 = Fortnum("Child3")
+
+        values = [Parent.child2, Parent.child3, Parent.child1]
+        self.assertEqual(Parent.sorted(values), [Parent.child1, Parent.child2, Parent.child3])
+        self.assertEqual(Parent.sorted(values, reverse=True), [Parent.child3, Parent.child2, Parent.child1])
+        self.assertEqual(max(values, key=Parent.sort_key), Parent.child3)
+        self.assertEqual(min(values, key=Parent.sort_key), Parent.child1)
+
+        with self.assertRaises(TypeError):
+            Parent.sorted([Parent.child1, Parent])
+
+    def test_sort_by_other_parent(self):
+        class Parent1(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        class Parent2(Fortnum):
+            child2 = Parent1.child2
+            child1 = Parent1.child1
+
+        self.assertEqual(Parent1.sorted([Parent1.child2, Parent1.child1]), [Parent1.child1, Parent1.child2])
+        self.assertEqual(Parent2.sorted([Parent1.child1, Parent1.child2]), [Parent1.child2, Parent1.child1])
+
     def test_unable_to_sort_without_common_parent(self):
         class Parent(Fortnum):
             child1 = Fortnum("Child1")
@@ -233,6 +514,9 @@ class FortnumCase(TestCase):
         with self.assertRaises(TypeError):
             Parent > Parent.child1
 
+        with self.assertRaises(TypeError):
+            Parent.child1 > 1
+
     def test_parent_unique_sorting(self):
         class Parent1(Fortnum):
             child1 = Fortnum("Child1")
@@ -292,6 +576,65 @@ class FortnumCase(TestCase):
 
         self.assertEqual(list(child.ancestors(ascending=True)), [GrandParent.Parent, GrandParent])
 
+    def test_depth(self):
+        class GrandParent(Fortnum):
+            class Parent(Fortnum):
+                Child = Fortnum("Child")
+
+        self.assertEqual(GrandParent.depth, 0)
+        self.assertEqual(GrandParent.Parent.depth, 1)
+        self.assertEqual(GrandParent.Parent.Child.depth, 2)
+
+    def test_lca_and_path(self):
+        class Root(Fortnum):
+            class A(Fortnum):
+                class A1(Fortnum):
+                    Leaf = Fortnum("Leaf")
+                A2 = Fortnum("A2")
+
+            class B(Fortnum):
+                B1 = Fortnum("B1")
+
+        class Other(Fortnum):
+            Child = Fortnum("Child")
+
+        self.assertEqual(Fortnum.lca(Root.A.A1.Leaf, Root.A.A2), Root.A)
+        self.assertEqual(Fortnum.lca(Root.A.A1.Leaf, Root.B.B1), Root)
+        self.assertEqual(Fortnum.lca(Root.A, Root.A.A1.Leaf), Root.A)
+        self.assertEqual(Fortnum.lca(Root.B, Root.B), Root.B)
+        self.assertIsNone(Fortnum.lca(Root.A, Other.Child))
+
+        self.assertEqual(
+            Fortnum.path(Root.A.A1.Leaf, Root.B.B1),
+            [Root.A.A1.Leaf, Root.A.A1, Root.A, Root, Root.B, Root.B.B1]
+        )
+        self.assertEqual(Fortnum.path(Root.A.A1.Leaf, Root.A), [Root.A.A1.Leaf, Root.A.A1, Root.A])
+        self.assertEqual(Fortnum.path(Root, Root.A.A1), [Root, Root.A, Root.A.A1])
+        self.assertEqual(Fortnum.path(Root.A, Root.A), [Root.A])
+        self.assertIsNone(Fortnum.path(Root.A, Other.Child))
+
+        self.assertEqual(Fortnum.distance(Root.A.A1.Leaf, Root.B.B1), 5)
+        self.assertEqual(Fortnum.distance(Root.A, Root.A), 0)
+
+    def test_lca_multiple_parents(self):
+        class Parent1(Fortnum):
+            Child = Fortnum("Child")
+
+        class Parent2(Fortnum):
+            Child = Parent1.Child
+            Other = Fortnum("Other")
+
+        class Root(Fortnum):
+            parent1 = Parent1
+            parent2 = Parent2
+
+        # The primary parent of Child is Parent1
+        self.assertEqual(Fortnum.lca(Parent2.Child, Parent2.Other), Root)
+        self.assertEqual(
+            Fortnum.path(Parent2.Child, Parent2.Other),
+            [Parent1.Child, Parent1, Root, Parent2, Parent2.Other]
+        )
+
     def test_family(self):
         child1 = Fortnum("Child1")
         child2 = Fortnum("Child2")
@@ -350,10 +693,557 @@ class FortnumCase(TestCase):
 
         self.assertFalse(NotAbstractChild.abstract)
 
+    def test_deserialize(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        self.assertEqual(Parent.deserialize(Parent.child2.serialize()), Parent.child2)
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.deserialize("child2")
+
+    def test_deserialize_many(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+            child2 = Fortnum("Child2")
+
+        self.assertEqual(
+            Parent.deserialize_many(["Child2", "Child1", "Child2"]),
+            [Parent.child2, Parent.child1, Parent.child2]
+        )
+        with self.assertRaises(FortnumDoesNotExist):
+            Parent.deserialize_many(["Child1", "Child3"])
+
+    def test_search(self):
+        class Food(Fortnum):
+            class Fruit(Fortnum):
+                mango = Fortnum("Mango", aliases=("Mangifera",))
+                melon = Fortnum("Melon")
+            class Vegetables(Fortnum):
+                marrow = Fortnum("Marrow")
+                mangetout = Fortnum("Mangetout")
+
+        self.assertEqual(Food.search("man"), [Food.Fruit.mango, Food.Vegetables.mangetout])
+        self.assertEqual(Food.search("M", limit=2), [Food.Fruit.mango, Food.Fruit.melon])
+        self.assertEqual(Food.search("mangi"), [Food.Fruit.mango])
+        self.assertEqual(Food.Vegetables.search("man"), [Food.Vegetables.mangetout])
+        self.assertEqual(Food.search_fuzzy("Melun"), [Food.Fruit.melon])
+        self.assertEqual(Food.search_fuzzy("Marow"), [Food.Vegetables.marrow])
+
+        plum = Fortnum("Plum")
+        Food.Fruit.add_child("plum", plum)
+        self.assertEqual(Food.search("pl"), [plum])
+
+    def test_index_on(self):
+        class Error(Fortnum):
+            severity = None
+
+        class Errors(Fortnum):
+            item_class = Error
+
+            class Disk(Error):
+                severity = 3
+                code = "D1"
+
+                full = Error("Full", severity=5, code="D2")
+
+            network = Error("Network", severity=2, code="N1")
+            timeout = Error("Timeout", severity=2, code="N2", tags=["slow"])
+            unknown = Error("Unknown")
+
+        by_code = Errors.index_on("code", unique=True)
+        self.assertIs(by_code.get("N2"), Errors.timeout)
+        self.assertIs(by_code.get("D2"), Errors.Disk.full)
+        self.assertIsNone(by_code.get("X17"))
+        self.assertIs(Errors.index_on("code", unique=True), by_code)
+
+        by_severity = Errors.index_on("severity")
+        self.assertEqual(by_severity.get(2), [Errors.network, Errors.timeout])
+        self.assertEqual(by_severity.get(None), [Errors.unknown])
+
+        with self.assertRaises(ValueError):
+            Errors.index_on("severity", unique=True)
+
+        # Unhashable values are left out of the hash index
+        self.assertEqual(Errors.index_on("tags").get("slow"), [])
+
+    def test_filter(self):
+        class Error(Fortnum):
+            severity = None
+
+        class Errors(Fortnum):
+            class Disk(Error):
+                severity = 3
+                full = Error("Full", severity=5, code="D2")
+            network = Error("Network", severity=2, code="N1")
+            timeout = Error("Timeout", severity=2, code="N2")
+            unknown = Error("Unknown")
+            other = Fortnum("Other", severity=4)
+
+        self.assertEqual(Errors.filter(severity__gte=3), [Errors.Disk, Errors.Disk.full, Errors.other])
+        self.assertEqual(Errors.filter(severity__gt=3, severity__lte=4), [Errors.other])
+        self.assertEqual(Errors.filter(severity__lt=3), [Errors.network, Errors.timeout])
+        self.assertEqual(Errors.filter(severity=2, code="N2"), [Errors.timeout])
+        self.assertEqual(Errors.filter(code__in=["N1", "D2", "X"]), [Errors.Disk.full, Errors.network])
+        self.assertEqual(Errors.filter(code="X17"), [])
+        self.assertEqual(Errors.Disk.filter(), [Errors.Disk.full])
+
+        Errors.item_class = Error
+        Errors.add_child("fatal", Error("Fatal", severity=9))
+        self.assertEqual(Errors.filter(severity__gte=4), [Errors.Disk.full, Errors.fatal])
+
+        with self.assertRaises(TypeError):
+            Errors.filter(code__gt=1)
+
+        # A misspelled lookup is an error rather than an attribute no descendant has
+        with self.assertRaisesRegex(ValueError, "gtee"):
+            Errors.filter(severity__gtee=3)
+        self.assertEqual(Errors.filter(unknown__gtee=3), [])
+
+    def test_deserialize_aliases(self):
+        class Fruits(Fortnum):
+            mango = Fortnum("Mango", aliases=("Mangifera",))
+            kiwi = Fortnum("Kiwi")
+
+        self.assertIs(Fruits.deserialize("Mangifera"), Fruits.mango)
+        self.assertEqual(Fruits.deserialize_many(iter(["Kiwi", "Mangifera"])), [Fruits.kiwi, Fruits.mango])
+        for key in ("mango", "mangifera"):
+            with self.assertRaises(FortnumDoesNotExist):
+                Fruits.deserialize(key)
+
+    def test_deserialize_normalized(self):
+        class Fruits(Fortnum):
+            normalize = fold_key
+            mango = Fortnum("Mango", aliases=("Mangifera",))
+            kiwi = Fortnum("Kiwi")
+
+        for key in ("Mango", "mango", "MANGO", " Mango ", "mangifera"):
+            self.assertIs(Fruits.deserialize(key), Fruits.mango)
+
+        papaya = Fortnum("Papaya", aliases=["Pawpaw"])
+        Fruits.add_child("papaya", papaya)
+        self.assertIs(Fruits.deserialize(" PAWPAW"), papaya)
+
+        with self.assertRaises(FortnumDoesNotExist) as context:
+            Fruits.deserialize(1)
+        self.assertEqual(
+            str(context.exception), "'1' is not a valid option for 'Fruits'. Try ['Mango', 'Kiwi', 'Papaya']"
+        )
+
+        with self.assertRaises(ValueError):
+            class Ambiguous(Fortnum):
+                normalize = fold_key
+                upper = Fortnum("KIWI")
+                lower = Fortnum("kiwi")
+
+    def test_deserialize_miss_cache(self):
+        normalized = []
+
+        def lower(key):
+            normalized.append(key)
+            return key.lower()
+
+        class Fruits(Fortnum):
+            normalize = lower
+            kiwi = Fortnum("Kiwi")
+
+        self.assertIs(Fruits.deserialize("KIWI"), Fruits.kiwi)
+        for _ in range(3):
+            with self.assertRaises(FortnumDoesNotExist):
+                Fruits.deserialize("Banana")
+        self.assertEqual(normalized, ["Kiwi", "KIWI", "Banana"])
+
+        size = FortnumMeta.miss_cache_size
+        FortnumMeta.miss_cache_size = 2
+        try:
+            for key in ("Apple", "Pear", "Plum"):
+                with self.assertRaises(FortnumDoesNotExist):
+                    Fruits.deserialize(key)
+            self.assertEqual(list(Fruits._misses), ["Pear", "Plum"])
+        finally:
+            FortnumMeta.miss_cache_size = size
+
+        # Adding a child forgets the misses
+        Fruits.add_child("banana", Fortnum("Banana"))
+        self.assertIs(Fruits.deserialize("BANANA"), Fruits.banana)
+
+    def test_add_child(self):
+        class Parent(Fortnum):
+            child1 = Fortnum("Child1")
+
+        child2 = Fortnum("Child2")
+        Parent.add_child("child2", child2)
+
+        self.assertEqual(list(Parent), [Parent.child1, child2])
+        self.assertEqual(Parent.child2, child2)
+        self.assertEqual(child2.parent, Parent)
+        self.assertTrue(Parent.child1 < child2)
+        self.assertEqual(Parent.deserialize("Child2"), child2)
+
+        with self.assertRaises(ValueError):
+            Parent.add_child("child2", Fortnum("Child3"))
+
+    def test_add_children(self):
+        class Parent(Fortnum):
+            related_name = "parents_of"
+            child1 = Fortnum("Child1")
+
+        child2, child3 = Fortnum("Child2"), Fortnum("Child3")
+        Parent.add_children({"child2": child2, "child3": child3})
+        self.assertEqual(list(Parent), [Parent.child1, child2, child3])
+        self.assertEqual([child.parent_index[Parent] for child in Parent], [0, 1, 2])
+        self.assertIs(Parent.deserialize("Child3"), child3)
+        self.assertEqual(list(child3.parents_of), [Parent])
+        self.assertEqual(relations.targets_of([Parent], "parents_of"), {Parent.child1, child2, child3})
+
+        # Nothing is added when any one of the children is rejected
+        child4 = Fortnum("Child4")
+        for items in ([("child4", child4), ("child1", Fortnum("Other"))], [("child4", child4), ("p", Parent)]):
+            with self.assertRaises(ValueError):
+                Parent.add_children(items)
+            self.assertEqual(list(Parent), [Parent.child1, child2, child3])
+            self.assertIsNone(child4.parent)
+            self.assertFalse(hasattr(child4, "parents_of"))
+
+    def test_registration_publishes_once(self):
+        writes = Counter()
+
+        class CountingMeta(FortnumMeta):
+            def __setattr__(self, key, value):
+                writes[self, key] += 1
+                super().__setattr__(key, value)
+
+        def counted(name, **attributes):
+            return CountingMeta(name, (Fortnum,), attributes)
+
+        def children():
+            return {"child%d" % index: counted("Child%d" % index) for index in range(100)}
+
+        cases = {
+            "related_name": lambda: counted("Parent", related_name="relatives", **children()),
+            "relation": lambda: counted(
+                "Parent", relation=FortnumRelation(*children().values(), related_name="relatives")
+            ),
+            "add_children": lambda: counted("Parent", related_name="relatives").add_children(children()),
+        }
+        for name, case in cases.items():
+            with self.subTest(case=name):
+                writes.clear()
+                case()
+                # Each related set and index is copied and replaced once, not once per child
+                self.assertEqual(max(writes.values()), 1, writes.most_common(1))
+
+    def test_add_child_cycle(self):
+        class Parent(Fortnum):
+            class Child(Fortnum):
+                grandchild = Fortnum("GrandChild")
+
+        for fortnum in (Parent, Parent.Child, Parent.Child.grandchild):
+            with self.assertRaises(ValueError):
+                Parent.Child.grandchild.add_child("ancestor", fortnum)
+
+        self.assertEqual(list(Parent.Child.grandchild), [])
+        self.assertFalse(hasattr(Parent.Child.grandchild, "ancestor"))
+        self.assertIs(Parent.Child.grandchild.root(), Parent)
+        self.assertEqual(list(Parent.descendants()), [Parent.Child, Parent.Child.grandchild])
+
+    def test_freeze(self):
+        class GrandParent(Fortnum):
+            class Parent(Fortnum):
+                Child1 = Fortnum("Child1")
+                Child2 = Fortnum("Child2")
+
+        self.assertEqual(GrandParent.freeze(), GrandParent)
+        self.assertTrue(GrandParent.frozen)
+        self.assertTrue(GrandParent.Parent.Child1.frozen)
+
+        self.assertEqual(list(GrandParent.Parent), [GrandParent.Parent.Child1, GrandParent.Parent.Child2])
+        self.assertIn(GrandParent.Parent.Child1, GrandParent.Parent)
+        self.assertTrue(GrandParent.Parent.Child1 < GrandParent.Parent.Child2)
+        self.assertEqual(GrandParent.Parent.deserialize("Child2"), GrandParent.Parent.Child2)
+        self.assertEqual(
+            list(GrandParent.descendants()),
+            [GrandParent.Parent, GrandParent.Parent.Child1, GrandParent.Parent.Child2]
+        )
+        self.assertEqual(GrandParent.Parent.Child1.root(), GrandParent)
+
+        # Changes elsewhere do not affect the frozen tree
+        class Other(Fortnum):
+            Child = Fortnum("Child")
+        self.assertEqual(GrandParent.Parent.Child1.root(), GrandParent)
+
+    def test_frozen_tree_can_not_change(self):
+        class Parent(Fortnum):
+            Child = Fortnum("Child")
+
+        compile_tree(Parent)
+
+        with self.assertRaises(FrozenFortnum):
+            Parent.add_child("Child2", Fortnum("Child2"))
+
+        with self.assertRaises(FrozenFortnum):
+            class OtherParent(Fortnum):
+                Child = Parent.Child
+
+        # The children declared before the frozen one are left unchanged
+        unfrozen = Fortnum("Unfrozen")
+        with self.assertRaises(FrozenFortnum):
+            class OtherParent(Fortnum):
+                Child1 = unfrozen
+                Child2 = Parent.Child
+        self.assertIsNone(unfrozen.parent)
+        self.assertEqual(len(unfrozen.parents), 0)
+
+        class RealParent(Fortnum):
+            Child = unfrozen
+        self.assertIs(unfrozen.root(), RealParent)
+
+        with self.assertRaises(FrozenFortnum):
+            Parent.Child.value = 1
+
+        with self.assertRaises(TypeError):
+            Parent.children["Child2"] = Fortnum("Child2")
+
+    def test_freeze_includes_other_parents(self):
+        class Parent1(Fortnum):
+            Child = Fortnum("Child")
+
+        class Parent2(Fortnum):
+            Child = Parent1.Child
+
+        Parent1.freeze()
+        self.assertTrue(Parent2.frozen)
+
+    def test_lookup(self):
+        class StoneFruits(Fortnum):
+            peach = Fortnum("Peach")
+            mango = Fortnum("Mango")
+
+        class TropicalFruits(Fortnum):
+            mango = StoneFruits.mango
+
+        self.assertEqual(Fortnum.lookup("StoneFruits"), StoneFruits)
+        self.assertEqual(Fortnum.lookup("Mango"), StoneFruits.mango)
+        self.assertEqual(Fortnum.lookup("StoneFruits.Mango"), StoneFruits.mango)
+        self.assertEqual(Fortnum.lookup("TropicalFruits.Mango"), StoneFruits.mango)
+        self.assertEqual(Fortnum.lookup_many(["Peach", "StoneFruits.Peach"]), [StoneFruits.peach, StoneFruits.peach])
+        self.assertEqual(StoneFruits.mango.qualified_key, "StoneFruits.Mango")
+
+        for key in ("Banana", "StoneFruits.Banana", "Banana.Mango"):
+            with self.assertRaises(FortnumDoesNotExist):
+                Fortnum.lookup(key)
+
+    def test_lookup_collision(self):
+        class Colors(Fortnum):
+            other = Fortnum("Other")
+
+        class Sizes(Fortnum):
+            other = Fortnum("Other")
+
+        with self.assertRaises(AmbiguousFortnum):
+            Fortnum.lookup("Other")
+
+        self.assertEqual(Fortnum.lookup("Colors.Other"), Colors.other)
+        self.assertEqual(Fortnum.lookup("Sizes.Other"), Sizes.other)
+
+    def test_lookup_abstract(self):
+        class Base(Fortnum):
+            abstract = True
+
+        with self.assertRaises(FortnumDoesNotExist):
+            Fortnum.lookup("Base")
+
+    def test_weak_registry(self):
+        Fortnum("Temporary")
+        collided = Fortnum("Collided")
+        Fortnum("Collided")
+        gc.collect()
+
+        with self.assertRaises(FortnumDoesNotExist):
+            Fortnum.lookup("Temporary")
+        self.assertEqual(Fortnum.lookup("Collided"), collided)
+
+        registry = FortnumMeta._registry
+        FortnumMeta.use_weak_registry(False)
+        try:
+            Fortnum("Kept")
+            gc.collect()
+            self.assertEqual(Fortnum.lookup("Kept").serialize(), "Kept")
+        finally:
+            FortnumMeta._registry = registry
+
+    def test_related_fortnums_collected(self):
+        temporary = Fortnum("Temporary", related_name="temporaries", child=Fortnum("Child"))
+        self.assertEqual(relations.targets_of([temporary], "temporaries"), {temporary.child})
+        self.assertEqual(relations.related_to_any("temporaries", [temporary.child]), {temporary})
+
+        reference = weakref.ref(temporary)
+        child = weakref.ref(temporary.child)
+        del temporary
+        gc.collect()
+        self.assertIsNone(reference())
+        self.assertIsNone(child())
+
+    def test_choices(self):
+        class Colors(Fortnum):
+            red = Fortnum("Red")
+            green = Fortnum("Green")
+
+        self.assertEqual(Colors.choices, (("Red", "Red"), ("Green", "Green")))
+        self.assertIs(Colors.choices, Colors.choices)
+        self.assertEqual(dict(Colors.choices_map), {"Red": Colors.red, "Green": Colors.green})
+
+        blue = Fortnum("Blue")
+        Colors.add_child("blue", blue)
+        self.assertEqual(Colors.choices, (("Red", "Red"), ("Green", "Green"), ("Blue", "Blue")))
+        self.assertIs(Colors.choices_map["Blue"], blue)
+
+    def test_grouped_choices(self):
+        class Food(Fortnum):
+            class Fruit(Fortnum):
+                apple = Fortnum("Apple")
+
+                class Citrus(Fortnum):
+                    lemon = Fortnum("Lemon")
+            bread = Fortnum("Bread")
+
+        self.assertEqual(Food.grouped_choices, (
+            ("Fruit", (("Apple", "Apple"), ("Citrus", "Citrus"), ("Lemon", "Lemon"))),
+            ("Bread", "Bread"),
+        ))
+        self.assertEqual(Food.choices, (("Fruit", "Fruit"), ("Bread", "Bread")))
+
+    def test_set(self):
+        class Permissions(Fortnum):
+            read = Fortnum("Read")
+            write = Fortnum("Write")
+            delete = Fortnum("Delete")
+
+        read, write, delete = Permissions.read, Permissions.write, Permissions.delete
+        editor = Permissions.Set(write, read)
+        self.assertIsInstance(editor, FortnumSet)
+        self.assertEqual(list(editor), [read, write])
+        self.assertEqual(int(editor), 0b011)
+        self.assertEqual(len(editor), 2)
+        self.assertIn(read, editor)
+        self.assertNotIn(delete, editor)
+        self.assertNotIn("Read", editor)
+        self.assertFalse(Permissions.Set())
+
+        admin = Permissions.Set(read, write, delete)
+        self.assertEqual(editor | Permissions.Set(delete), admin)
+        self.assertEqual(admin & Permissions.Set(delete, read), Permissions.Set(read, delete))
+        self.assertEqual(admin - editor, Permissions.Set(delete))
+        self.assertEqual(editor ^ Permissions.Set(write, delete), Permissions.Set(read, delete))
+        self.assertTrue(editor <= admin)
+        self.assertTrue(editor < admin)
+        self.assertFalse(admin <= editor)
+        self.assertTrue(admin > editor)
+        self.assertEqual(hash(editor), hash(Permissions.Set(read, write)))
+
+        # Interoperates with builtin sets
+        self.assertEqual(editor, {read, write})
+        self.assertEqual(editor & {write, delete}, Permissions.Set(write))
+        self.assertEqual({delete} | editor, admin)
+        self.assertEqual(hash(editor), hash(frozenset({read, write})))
+        self.assertIn(editor, {frozenset({read, write})})
+
+        # Sets with anything besides children give frozensets
+        self.assertEqual({Permissions, read} - editor, frozenset({Permissions}))
+        self.assertEqual({Permissions} | editor, frozenset({Permissions, read, write}))
+        self.assertIsInstance(editor ^ {Permissions, read}, frozenset)
+
+        with self.assertRaises(TypeError):
+            Permissions.Set(Permissions)
+
+    def test_set_int(self):
+        class Permissions(Fortnum):
+            read = Fortnum("Read")
+            write = Fortnum("Write")
+
+        self.assertEqual(FortnumSet.from_int(Permissions, 2), Permissions.Set(Permissions.write))
+        self.assertEqual(repr(FortnumSet.from_int(Permissions, 3)), "Permissions.Set(Read, Write)")
+        for mask in (-1, 4):
+            with self.assertRaises(ValueError):
+                FortnumSet.from_int(Permissions, mask)
+
+    def test_concurrent_registration(self):
+        class Catalog(Fortnum):
+            related_name = "catalogs"
+            first = Fortnum("First")
+
+        class Tag(Fortnum):
+            catalogs = None
+
+        writers, per_writer = 4, 200
+        errors = []
+        created = []
+        done = threading.Event()
+
+        def write(number):
+            # Each writer loads the catalogs of its tenants in batches, one tenant alone with add_child
+            try:
+                for start in range(0, per_writer, 20):
+                    items = [
+                        ("Item%d_%d" % (number, index), Fortnum(
+                            "Item%d_%d" % (number, index), tags=FortnumRelation(Tag, related_name="items")
+                        ))
+                        for index in range(start, start + 20)
+                    ]
+                    created.extend(item for _, item in items)
+                    if start:
+                        Catalog.add_children(items)
+                    else:
+                        for key, item in items:
+                            Catalog.add_child(key, item)
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                while not done.is_set():
+                    children = list(Catalog)
+                    self.assertEqual(children[0], Catalog.first)
+                    for child in children:
+                        self.assertIn(child, Catalog)
+                        self.assertIs(Catalog.deserialize(child.serialize()), child)
+                    self.assertEqual(sorted(children), children)
+                    descendants = list(Catalog.descendants())
+                    self.assertEqual(descendants, list(Catalog.children.values())[:len(descendants)])
+                    self.assertLessEqual(len(children), len(Catalog))
+                    for item in created[-40:]:
+                        if item in Catalog:
+                            self.assertIs(Catalog.deserialize(item.serialize()), item)
+                            self.assertIn(item, list(Catalog))
+                    list(getattr(Tag, "items", None) or ())
+            except Exception as e:
+                errors.append(e)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            readers = [threading.Thread(target=read) for _ in range(4)]
+            threads = [threading.Thread(target=write, args=(number,)) for number in range(writers)]
+            for thread in readers + threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            done.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(Catalog), writers * per_writer + 1)
+        self.assertEqual([child.parent_index[Catalog] for child in Catalog], list(range(len(Catalog))))
+        self.assertEqual(len(Tag.items), writers * per_writer)
+        self.assertEqual(len(Catalog.first.catalogs), 1)
+
 
 class DescriptorTestCase(TestCase):
     def setUp(self):
-        FortnumMeta._registry = {}  # Allow redeclaration between tests
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
         # clear_registries(Fortnum)
 
         class Fruits(Fortnum):
@@ -395,3 +1285,188 @@ class DescriptorTestCase(TestCase):
 
 
 
+
+    def test_none_allowed(self):
+        class Obj:
+            fruit = FortnumDescriptor("fruits", self.Fruits, allow_none=True)
+
+        o = Obj()
+        o.fruit = self.Fruits.Tomato
+        o.fruit = None
+        self.assertIsNone(o.fruit)
+
+    def test_instance_dict_storage(self):
+        self.o.fruit = self.Fruits.Tomato
+        self.assertEqual(vars(self.o), {"fruit": self.Fruits.Tomato})
+
+    def test_slot_storage(self):
+        Fruits = self.Fruits
+
+        class Obj:
+            __slots__ = ("_fruit",)
+            fruit = FortnumDescriptor("fruits", Fruits, default=Fruits.Banana, slot="_fruit")
+
+        o = Obj()
+        self.assertEqual(o.fruit, Fruits.Banana)
+        o.fruit = Fruits.Tomato
+        self.assertEqual(o.fruit, Fruits.Tomato)
+        self.assertEqual(o._fruit, Fruits.Tomato)
+        o.fruit = None
+        self.assertEqual(o.fruit, Fruits.Banana)
+
+    def test_weak_storage(self):
+        class Obj:
+            pass
+
+        Obj.fruit = FortnumDescriptor("fruits", self.Fruits)  # __set_name__ is not called
+        o1, o2 = Obj(), Obj()
+        o1.fruit = self.Fruits.Tomato
+        self.assertEqual(o1.fruit, self.Fruits.Tomato)
+        self.assertIsNone(o2.fruit)
+        self.assertEqual(vars(o1), {})
+
+    def test_invalid_value_message(self):
+        with self.assertRaises(InvalidFortnumValue) as context:
+            self.o.plant = self.Fruits
+        self.assertEqual(
+            str(context.exception), "'Fruits' is not a valid option for 'plants'. Try [Grass, Banana, Tomato]"
+        )
+
+        with self.assertRaises(InvalidFortnumValue) as context:
+            self.o.plant = None
+        self.assertEqual(str(context.exception), "None not allowed.")
+
+    def test_validate_many(self):
+        Fruits, Plants = self.Fruits, self.Plants
+        descriptor = type(self.o).__dict__["plant"]
+
+        report = descriptor.validate_many([Plants.Grass, Fruits.Banana])
+        self.assertTrue(report.valid)
+        self.assertEqual(report.count, 2)
+
+        report = descriptor.validate_many(iter([Plants.Grass, None, Fruits, [], Plants.Tomato, "Grass"]))
+        self.assertFalse(report.valid)
+        self.assertEqual(report.count, 6)
+        self.assertEqual(report.invalid, [(1, None), (2, Fruits), (3, []), (5, "Grass")])
+        self.assertEqual([index for index, error in report.errors()], [1, 2, 3, 5])
+        self.assertTrue(all(isinstance(error, InvalidFortnumValue) for _, error in report.errors()))
+        self.assertIn("4 of 6 values of 'plants' are invalid", str(report))
+        self.assertIn("  2: 'Fruits' is not a valid option", str(report))
+
+        self.assertTrue(type(self.o).__dict__["fruit"].validate_many([None]).valid)  # None resets to the default
+
+    def test_bulk_assign(self):
+        Fruits, Plants = self.Fruits, self.Plants
+        Obj = type(self.o)
+        instances = [Obj() for _ in range(4)]
+
+        bulk_assign(instances, "plant", [Plants.Grass, Plants.Banana, Plants.Tomato, Plants.Grass])
+        self.assertEqual([o.plant for o in instances], [Plants.Grass, Fruits.Banana, Fruits.Tomato, Plants.Grass])
+
+        bulk_assign(instances[:2], "fruit", [Fruits.Tomato, None])
+        self.assertEqual([o.fruit for o in instances], [Fruits.Tomato, Fruits.Banana, Fruits.Banana, Fruits.Banana])
+
+        with self.assertRaises(BulkValidationError) as context:
+            bulk_assign(instances, "plant", [Plants.Banana, Fruits, None, Plants.Grass])
+        self.assertEqual([index for index, _ in context.exception.report.invalid], [1, 2])
+        self.assertIsInstance(context.exception, ValueError)
+        # Nothing is assigned when any value is invalid
+        self.assertEqual(instances[0].plant, Plants.Grass)
+
+        with self.assertRaises(ValueError):
+            bulk_assign(instances, "plant", [Plants.Grass])
+
+        with self.assertRaises(AttributeError):
+            bulk_assign(instances, "tree", [None] * 4)
+
+    def test_bulk_assign_storage(self):
+        Fruits = self.Fruits
+
+        class SlotObj:
+            __slots__ = ("_fruit", "__weakref__")
+            fruit = FortnumDescriptor("fruits", Fruits, allow_none=True, slot="_fruit")
+
+        class WeakObj:
+            pass
+
+        WeakObj.fruit = FortnumDescriptor("fruits", Fruits, allow_none=True)
+
+        for Obj in (SlotObj, WeakObj):
+            instances = [Obj(), Obj()]
+            bulk_assign(instances, "fruit", [Fruits.Tomato, Fruits.Banana])
+            self.assertEqual([o.fruit for o in instances], [Fruits.Tomato, Fruits.Banana])
+            bulk_assign(instances, "fruit", [None, Fruits.Tomato])
+            self.assertEqual([o.fruit for o in instances], [None, Fruits.Tomato])
+
+    def test_coerce(self):
+        Plants = self.Plants
+
+        class Obj:
+            plant = FortnumDescriptor("plants", Plants, coerce=True)
+
+        o = Obj()
+        for value, expected in ((Plants.Banana, Plants.Banana), ("Tomato", Plants.Tomato), (0, Plants.Grass)):
+            o.plant = value
+            self.assertIs(o.plant, expected)
+
+        for value in ("Apple", 3, -1, True, False, 0.0, 1.0, Fraction(2), [], self.Fruits):
+            with self.assertRaises(InvalidFortnumValue):
+                o.plant = value
+        self.assertIs(o.plant, Plants.Grass)
+
+        report = Obj.__dict__["plant"].validate_many(["Grass", 2, True, "Apple", Plants.Banana, 1.0])
+        self.assertEqual(report.invalid, [(2, True), (3, "Apple"), (5, 1.0)])
+
+        instances = [Obj(), Obj(), Obj()]
+        bulk_assign(instances, "plant", ["Banana", 0, Plants.Tomato])
+        self.assertEqual([o.plant for o in instances], [Plants.Banana, Plants.Grass, Plants.Tomato])
+
+    def test_coerce_follows_tree_changes(self):
+        Fruits = self.Fruits
+
+        class Obj:
+            fruit = FortnumDescriptor("fruits", Fruits, coerce=True)
+
+        o = Obj()
+        with self.assertRaises(InvalidFortnumValue):
+            o.fruit = "Apple"
+
+        apple = Fortnum("Apple")
+        Fruits.add_child("Apple", apple)
+        o.fruit = "Apple"
+        self.assertIs(o.fruit, apple)
+        o.fruit = 2
+        self.assertIs(o.fruit, apple)
+
+    def test_store_code(self):
+        Fruits = self.Fruits
+
+        class DictObj:
+            fruit = FortnumDescriptor("fruits", Fruits, default=Fruits.Banana, store_code=True, coerce=True)
+
+        class SlotObj:
+            __slots__ = ("_fruit", "__weakref__")
+            fruit = FortnumDescriptor("fruits", Fruits, default=Fruits.Banana, store_code=True, slot="_fruit")
+
+        class WeakObj:
+            pass
+
+        WeakObj.fruit = FortnumDescriptor("fruits", Fruits, default=Fruits.Banana, store_code=True)
+
+        for Obj in (DictObj, SlotObj, WeakObj):
+            with self.subTest(Obj=Obj.__name__):
+                o = Obj()
+                self.assertIs(o.fruit, Fruits.Banana)
+                o.fruit = Fruits.Tomato
+                self.assertIs(o.fruit, Fruits.Tomato)
+                o.fruit = None
+                self.assertIs(o.fruit, Fruits.Banana)
+
+                instances = [Obj(), Obj()]
+                bulk_assign(instances, "fruit", [Fruits.Tomato, None])
+                self.assertEqual([o.fruit for o in instances], [Fruits.Tomato, Fruits.Banana])
+
+        o = DictObj()
+        o.fruit = "Tomato"
+        self.assertEqual(vars(o), {"fruit": 1})
+        self.assertIs(DictObj.fruit, Fruits.Banana)
@@ -0,0 +1,102 @@
+import logging
+from unittest import TestCase
+
+from fortnum import Fortnum, FortnumDescriptor, FortnumDoesNotExist
+from fortnum import instrumentation
+from fortnum.fortnum import FortnumMeta
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
+
+        class Colors(Fortnum):
+            red = Fortnum("Red")
+            green = Fortnum("Green")
+        self.Colors = Colors
+
+        class Model:
+            color = FortnumDescriptor("color", Colors, default=Colors.red)
+        self.Model = Model
+
+        self.events = []
+        instrumentation.enable(sinks=[self.events.append])
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+
+    def counts(self):
+        return {key: stats.count for key, stats in instrumentation.stats.operations.items()}
+
+    def test_disable_restores_methods(self):
+        instrumentation.disable()
+        originals = [owner.__dict__[attribute] for _, owner, attribute, _ in instrumentation.INSTRUMENTED]
+
+        instrumentation.enable(sinks=[self.events.append])
+        self.assertTrue(instrumentation.enabled())
+        self.assertIsNot(FortnumMeta.__dict__["__contains__"], originals[2])
+
+        instrumentation.disable()
+        self.assertFalse(instrumentation.enabled())
+        self.assertEqual(
+            [owner.__dict__[attribute] for _, owner, attribute, _ in instrumentation.INSTRUMENTED], originals
+        )
+
+        self.Colors.deserialize("Red")
+        self.assertEqual(self.events, [])
+
+    def test_operations(self):
+        Colors = self.Colors
+        Colors.deserialize("Red")
+        Colors.deserialize_many(["Red", "Green"])
+        self.assertIn(Colors.red, Colors)
+        self.assertTrue(Colors.red < Colors.green)
+        list(Colors.descendants())
+        Colors.red.ancestors()
+
+        instance = self.Model()
+        instance.color = Colors.green
+        self.assertEqual(instance.color, Colors.green)
+
+        self.assertEqual(self.counts(), {
+            ("deserialize", "Colors"): 2,
+            ("contains", "Colors"): 2,  # Once more by the descriptor
+            ("compare", "Colors"): 1,
+            ("traverse", "Colors"): 2,
+            ("descriptor_get", "Colors"): 1,
+            ("descriptor_set", "Colors"): 1,
+        })
+
+    def test_errors(self):
+        with self.assertRaises(FortnumDoesNotExist):
+            self.Colors.deserialize("Blue")
+
+        event, = self.events
+        self.assertEqual((event.operation, event.root), ("deserialize", "Colors"))
+        self.assertIsInstance(event.error, FortnumDoesNotExist)
+        self.assertEqual(instrumentation.stats.operations["deserialize", "Colors"].errors, 1)
+
+    def test_histogram(self):
+        stats = instrumentation.Stats(buckets=(1e-3, 1.0))
+        for seconds in (1e-4, 1e-2, 1e-2, 5.0):
+            stats.record(instrumentation.Event("deserialize", "Colors", seconds, None))
+        self.assertEqual(stats.operations["deserialize", "Colors"].buckets, [1, 2, 1])
+
+        text = stats.prometheus()
+        self.assertIn('fortnum_operation_seconds_bucket{operation="deserialize",root="Colors",le="0.001"} 1', text)
+        self.assertIn('fortnum_operation_seconds_bucket{operation="deserialize",root="Colors",le="1.0"} 3', text)
+        self.assertIn('fortnum_operation_seconds_bucket{operation="deserialize",root="Colors",le="+Inf"} 4', text)
+        self.assertIn('fortnum_operation_seconds_count{operation="deserialize",root="Colors"} 4', text)
+        self.assertIn('fortnum_operation_errors_total{operation="deserialize",root="Colors"} 0', text)
+        self.assertIn("# TYPE fortnum_operation_seconds histogram", text)
+
+    def test_logging_sink(self):
+        instrumentation.enable(sinks=[instrumentation.LoggingSink(level=logging.INFO)])
+        with self.assertLogs("fortnum", level=logging.INFO) as logs:
+            self.Colors.deserialize("Red")
+            with self.assertRaises(FortnumDoesNotExist):
+                self.Colors.deserialize("Blue")
+
+        self.assertEqual([record.levelno for record in logs.records], [logging.INFO, logging.WARNING])
+        self.assertIn("deserialize on 'Colors'", logs.output[0])
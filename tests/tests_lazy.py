@@ -0,0 +1,130 @@
+import io
+from unittest import TestCase
+
+from fortnum import Fortnum, FortnumDoesNotExist
+from fortnum.fortnum import FortnumMeta
+from fortnum.lazy import tree_from_dict, tree_from_json, tree_from_yaml
+
+SPEC = {
+    "label": "Catalog",
+    "Fruit": {
+        "label": "Fruit",
+        "Apple": {"label": "Apple", "price": 3},
+        "Pear": {"label": "Pear", "price": 4},
+    },
+    "Vegetables": {
+        "Carrot": {"price": 1},
+    },
+}
+
+
+class LazyTestCase(TestCase):
+    def setUp(self):
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
+        FortnumMeta._lazy.clear()
+        FortnumMeta._lazy_keys.clear()
+        FortnumMeta._lazy_specs.clear()
+
+    def test_children_created_on_attribute_access(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        self.assertEqual(catalog.label, "Catalog")
+        self.assertIn(catalog, FortnumMeta._lazy)
+        self.assertNotIn("Fruit", catalog.__dict__)
+
+        fruit = catalog.Fruit
+        self.assertNotIn(catalog, FortnumMeta._lazy)
+        self.assertIn(fruit, FortnumMeta._lazy)
+        self.assertEqual(fruit.label, "Fruit")
+        self.assertEqual(fruit.parent, catalog)
+        self.assertEqual(fruit.Apple.price, 3)
+
+    def test_missing_attribute(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        with self.assertRaises(AttributeError):
+            catalog.Meat
+        with self.assertRaises(AttributeError):
+            catalog.Fruit.Apple.Seeds
+
+        # Only the keys of the children create them
+        catalog = tree_from_dict("Catalog", SPEC)
+        self.assertFalse(hasattr(catalog, "Meat"))
+        self.assertIn(catalog, FortnumMeta._lazy)
+
+    def test_iteration_and_len(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual([child.serialize() for child in catalog], ["Fruit", "Vegetables"])
+        self.assertEqual(list(catalog.children), ["Fruit", "Vegetables"])
+
+    def test_deserialize(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        self.assertEqual(catalog.Fruit.deserialize("Pear"), catalog.Fruit.Pear)
+        with self.assertRaises(FortnumDoesNotExist):
+            catalog.Vegetables.deserialize("Pear")
+
+    def test_lookup(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        carrot = Fortnum.lookup("Catalog.Vegetables.Carrot")
+        self.assertEqual(carrot.price, 1)
+        self.assertIs(carrot, catalog.Vegetables.Carrot)
+        self.assertIn(catalog.Fruit, FortnumMeta._lazy)  # Only the path to the key is created
+
+        self.assertEqual(Fortnum.lookup("Pear").price, 4)
+        self.assertFalse(FortnumMeta._lazy)
+
+        with self.assertRaises(FortnumDoesNotExist):
+            Fortnum.lookup("Catalog.Vegetables.Potato")
+
+    def test_lookup_creates_only_the_path(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        with self.assertRaises(FortnumDoesNotExist):
+            Fortnum.lookup("Typo")
+        self.assertIn(catalog, FortnumMeta._lazy)
+
+        self.assertEqual(Fortnum.lookup("Apple").price, 3)
+        self.assertIn(catalog.Vegetables, FortnumMeta._lazy)
+        self.assertIs(Fortnum.lookup("Apple"), catalog.Fruit.Apple)
+
+    def test_traversal(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        self.assertEqual(
+            [fortnum.serialize() for fortnum in catalog.descendants()],
+            ["Fruit", "Apple", "Pear", "Vegetables", "Carrot"]
+        )
+
+    def test_freeze(self):
+        catalog = tree_from_dict("Catalog", SPEC)
+        catalog.freeze()
+        self.assertTrue(catalog.Fruit.Apple.frozen)
+        self.assertFalse(FortnumMeta._lazy)
+
+    def test_eager(self):
+        catalog = tree_from_dict("Catalog", SPEC, lazy=False)
+        self.assertFalse(FortnumMeta._lazy)
+        self.assertIn("Fruit", catalog.__dict__)
+        self.assertEqual(catalog.Fruit.Pear.price, 4)
+        self.assertEqual(catalog.Vegetables.Carrot.parent, catalog.Vegetables)
+
+    def test_base(self):
+        class Product(Fortnum):
+            price = 0
+
+        catalog = tree_from_dict("Catalog", SPEC, base=Product)
+        self.assertTrue(issubclass(catalog.Fruit.Apple, Product))
+        self.assertEqual(catalog.Vegetables.price, 0)
+
+    def test_json(self):
+        catalog = tree_from_json("Catalog", '{"Fruit": {"Apple": {"price": 3}}}')
+        self.assertEqual(catalog.Fruit.Apple.price, 3)
+
+        catalog = tree_from_json("Catalog", io.StringIO('{"Fruit": {"Pear": {"price": 4}}}'))
+        self.assertEqual(catalog.Fruit.Pear.price, 4)
+
+    def test_yaml(self):
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML is not installed")
+
+        catalog = tree_from_yaml("Catalog", "Fruit:\n  Apple:\n    price: 3\n")
+        self.assertEqual(catalog.Fruit.Apple.price, 3)
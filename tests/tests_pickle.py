@@ -0,0 +1,78 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, skipUnless
+
+from fortnum import Fortnum
+from fortnum.fortnum import FortnumMeta
+
+
+class Status(Fortnum):
+    ok = Fortnum("Ok")  # Not found as tests.tests_pickle.Ok, pickled by its qualified key
+    failed = Fortnum("Failed")
+
+    class Retrying(Fortnum):
+        pass
+
+
+class Base(Fortnum):
+    abstract = True  # Not in the registry, its children are pickled by their position below it
+    first = Fortnum("First")
+    second = Fortnum("Second")
+
+
+def describe(batch):
+    # Runs in the worker process
+    return [(status, status.serialize(), status.parent) for status in batch]
+
+
+class PickleTestCase(TestCase):
+    def setUp(self):
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
+        for fortnum in Status.descendants(include_self=True):
+            fortnum._register()
+
+    def round_trip(self, obj):
+        return pickle.loads(pickle.dumps(obj))
+
+    def test_module_global(self):
+        self.assertIs(self.round_trip(Status), Status)
+        self.assertIs(self.round_trip(Status.Retrying), Status.Retrying)
+        self.assertIn(b"Status.Retrying", pickle.dumps(Status.Retrying))
+
+    def test_one_liner(self):
+        self.assertEqual(Status.ok.__module__, __name__)
+        self.assertIs(self.round_trip(Status.ok), Status.ok)
+        self.assertIn(b"Status.Ok", pickle.dumps(Status.ok))
+
+    def test_position_below_root(self):
+        self.assertIs(self.round_trip(Base.second), Base.second)
+
+    def test_runtime_fortnums(self):
+        parent = Fortnum("RuntimeParent", child=Fortnum("RuntimeChild"))
+        self.assertIs(self.round_trip(parent), parent)
+        self.assertIs(self.round_trip(parent.child), parent.child)
+
+    def test_batch_shares_references(self):
+        batch = [Status.ok, Status.failed] * 1000
+        self.assertEqual(self.round_trip(batch), batch)
+        self.assertLess(len(pickle.dumps(batch)), 4 * len(batch))
+
+    def test_unresolvable(self):
+        Fortnum("Twin")
+        twin = Fortnum("Twin")
+        with self.assertRaises(pickle.PicklingError):
+            pickle.dumps(twin)
+
+    @skipUnless("fork" in multiprocessing.get_all_start_methods(), "Requires the fork start method")
+    def test_process_pool(self):
+        runtime = Fortnum("Runtime", a=Fortnum("RuntimeA"), b=Fortnum("RuntimeB"))
+        batches = [[Status.ok, Status.failed, Base.first], [runtime.a, runtime.b, Status.Retrying]]
+
+        with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("fork")) as executor:
+            results = list(executor.map(describe, batches))
+
+        self.assertEqual(results, [
+            [(Status.ok, "Ok", Status), (Status.failed, "Failed", Status), (Base.first, "First", Base)],
+            [(runtime.a, "RuntimeA", runtime), (runtime.b, "RuntimeB", runtime), (Status.Retrying, "Retrying", Status)],
+        ])
@@ -0,0 +1,152 @@
+import io
+from unittest import TestCase
+
+from fortnum import Fortnum, fold_key
+from fortnum.fortnum import FortnumMeta, FortnumRelation
+from fortnum.snapshot import dump_tree, load_tree, SnapshotError
+
+
+class Colour(Fortnum):
+    hex = None
+    shapes = None
+
+
+class Colours(Fortnum):
+    class red(Colour):
+        hex = "#f00"
+
+    class green(Colour):
+        hex = "#0f0"
+
+
+class Shape(Fortnum):
+    related_name = "shapes"
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        FortnumMeta._registry.clear()  # Allow redeclaration between tests
+
+    def reload(self, root):
+        fp = io.BytesIO()
+        dump_tree(root, fp)
+        fp.seek(0)
+        return load_tree(fp)
+
+    def test_round_trip(self):
+        shared = Fortnum("Shared", weight=3)
+        root = Fortnum(
+            "Root",
+            first=Fortnum("First", shared=shared, other=Fortnum("Other")),
+            second=Fortnum("Second", shared=shared),
+            values=[1, 2],
+        )
+
+        loaded = self.reload(root)
+
+        self.assertIsNot(loaded, root)
+        self.assertEqual(loaded.serialize(), "Root")
+        self.assertEqual(loaded.values, [1, 2])
+        self.assertEqual(list(loaded.children), ["first", "second"])
+        self.assertEqual([child.serialize() for child in loaded.first], ["Shared", "Other"])
+        self.assertIs(loaded.first.shared, loaded.second.shared)
+        self.assertEqual(loaded.first.shared.weight, 3)
+        self.assertEqual(list(loaded.first.shared.parents), [loaded.first, loaded.second])
+        self.assertEqual(loaded.first.shared.parent, loaded.first)
+        self.assertEqual(loaded.second.deserialize("Shared"), loaded.second.shared)
+        self.assertTrue(loaded.first < loaded.second)
+        self.assertFalse(loaded.first.abstract)
+
+    def test_aliases(self):
+        root = Fortnum("Root", normalize=fold_key, mango=Fortnum("Mango", aliases=("Mangifera",)))
+        loaded = self.reload(root)
+        self.assertIs(loaded.deserialize(" MANGIFERA"), loaded.mango)
+        self.assertIs(loaded.deserialize("mango"), loaded.mango)
+
+    def test_subclasses_and_relations(self):
+        root = Fortnum(
+            "Shapes",
+            circle=Shape("Circle", colour=Colours.red),
+            square=Shape("Square", colours=FortnumRelation(Colours.red, Colours.green)),
+        )
+
+        loaded = self.reload(root)
+
+        self.assertTrue(issubclass(loaded.circle, Shape))
+        # Red is a child of circle and part of the snapshot, green is only related and stays the original
+        self.assertIsNot(loaded.circle.colour, Colours.red)
+        self.assertTrue(issubclass(loaded.circle.colour, Colour))
+        self.assertEqual(loaded.circle.colour.hex, "#f00")
+        self.assertEqual(list(loaded.circle.colour.shapes), [loaded.circle, loaded.square])
+        self.assertIn(loaded.square, Colours.green.shapes)
+
+    def test_deep_tree(self):
+        fortnum = Fortnum("Node600")
+        for index in range(599, 0, -1):
+            fortnum = Fortnum("Node%d" % index, child=fortnum)
+
+        loaded = self.reload(fortnum)
+        leaf = list(loaded.descendants())[-1]
+        self.assertEqual(leaf.serialize(), "Node600")
+        self.assertEqual(leaf.depth, 599)
+
+    def test_nested_value(self):
+        value = []
+        for _ in range(100000):
+            value = [value]
+
+        with self.assertRaisesRegex(SnapshotError, "nested too deeply"):
+            dump_tree(Fortnum("Root", child=Fortnum("Child", value=value)), io.BytesIO())
+
+    def test_unpicklable_value(self):
+        class Root(Fortnum):
+            class Child(Fortnum):
+                @classmethod
+                def label(cls):
+                    return cls.serialize()
+
+        fp = io.BytesIO()
+        with self.assertRaisesRegex(SnapshotError, "'Child.label' can not be pickled"):
+            dump_tree(Root, fp)
+        self.assertEqual(fp.getvalue(), b"")
+
+    def test_attributes_referring_to_the_tree(self):
+        class Moves(Fortnum):
+            class rock(Fortnum):
+                pass
+
+            paper = Fortnum("Paper", beats=FortnumRelation(rock, related_name="beaten_by"))
+            scissors = Fortnum("Scissors", beats=FortnumRelation(paper, related_name="beaten_by"))
+
+        Moves.rock.beats = Moves.scissors
+        Moves.rock.options = {"next": [Moves.paper]}
+
+        loaded = self.reload(Moves)
+        self.assertEqual(loaded.rock.__qualname__, "SnapshotTestCase.test_attributes_referring_to_the_tree.<locals>."
+                                                   "Moves.rock")
+        self.assertIs(loaded.rock.beats, loaded.scissors)
+        self.assertIs(loaded.rock.options["next"][0], loaded.paper)
+        self.assertEqual(list(loaded.paper.beats), [loaded.rock])
+        self.assertEqual(list(loaded.rock.beaten_by), [loaded.paper])
+        self.assertEqual(list(loaded.paper.beaten_by), [loaded.scissors])
+
+    def test_many_sources(self):
+        target = Fortnum("Target")
+        sources = [Shape("Source%d" % index, target=target) for index in range(100)]
+        root = Fortnum("Root", target=target, **{"source%d" % index: source for index, source in enumerate(sources)})
+
+        loaded = self.reload(root)
+        self.assertEqual(
+            [source.serialize() for source in loaded.target.shapes], ["Source%d" % index for index in range(100)]
+        )
+        self.assertEqual(
+            [parent.serialize() for parent in loaded.target.parents], [parent.serialize() for parent in target.parents]
+        )
+        self.assertIs(loaded.target.parent, loaded.source0)
+
+    def test_invalid_snapshot(self):
+        with self.assertRaises(SnapshotError):
+            load_tree(io.BytesIO(b"NOPE\x01\x00"))
+
+        with self.assertRaises(SnapshotError):
+            load_tree(io.BytesIO(b"FTNM\xff\x00"))
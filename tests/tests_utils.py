@@ -0,0 +1,106 @@
+from unittest import TestCase
+
+from fortnum.utils import OrderedSet, KeySearch, AttributeIndex
+
+
+class OrderedSetTestCase(TestCase):
+    def test_order(self):
+        s = OrderedSet([3, 1, 2])
+        s.add(0)
+        s.add(1)
+        self.assertEqual(list(s), [3, 1, 2, 0])
+        self.assertEqual(list(reversed(s)), [0, 2, 1, 3])
+
+    def test_discard(self):
+        s = OrderedSet([3, 1, 2])
+        s.discard(1)
+        s.discard(4)
+        self.assertEqual(list(s), [3, 2])
+        self.assertNotIn(1, s)
+        self.assertEqual(len(s), 2)
+
+    def test_pop(self):
+        s = OrderedSet([3, 1, 2])
+        self.assertEqual(s.pop(), 2)
+        self.assertEqual(s.pop(last=False), 3)
+        self.assertEqual(s.pop(), 1)
+        with self.assertRaises(KeyError):
+            s.pop()
+
+    def test_and(self):
+        s = OrderedSet([3, 1, 2]) & OrderedSet([2, 3, 4])
+        self.assertIsInstance(s, OrderedSet)
+        self.assertEqual(list(s), [2, 3])
+
+    def test_eq(self):
+        self.assertEqual(OrderedSet([1, 2]), OrderedSet([1, 2]))
+        self.assertNotEqual(OrderedSet([1, 2]), OrderedSet([2, 1]))
+        # Compared to other iterables equality means sharing at least one element
+        self.assertTrue(OrderedSet([1, 2]) == [2, 3])
+        self.assertFalse(OrderedSet([1, 2]) == [])
+
+    def test_repr(self):
+        self.assertEqual(repr(OrderedSet()), "OrderedSet()")
+        self.assertEqual(repr(OrderedSet([1, 2])), "OrderedSet([1, 2])")
+
+
+class KeySearchTestCase(TestCase):
+    def setUp(self):
+        nodes = ["carrot", "cabbage", "car", "apple", "kale"]
+        aliases = {"kale": ["borecole"]}
+        self.search = KeySearch(nodes, lambda node: [node] + aliases.get(node, []))
+
+    def test_prefix(self):
+        self.assertEqual(self.search.prefix("ca"), ["carrot", "cabbage", "car"])
+        self.assertEqual(self.search.prefix("car"), ["carrot", "car"])
+        self.assertEqual(self.search.prefix("ca", limit=2), ["carrot", "cabbage"])
+        self.assertEqual(self.search.prefix("bore"), ["kale"])
+        self.assertEqual(self.search.prefix("x"), [])
+        self.assertEqual(len(self.search.prefix("")), 5)
+
+    def test_within(self):
+        self.assertEqual(self.search.within("car", 0), ["car"])
+        self.assertEqual(self.search.within("cat", 1), ["car"])
+        self.assertEqual(self.search.within("carot", 1), ["carrot"])
+        self.assertEqual(self.search.within("appel", 2), ["apple"])
+        self.assertEqual(self.search.within("kael", 1), [])
+        self.assertEqual(self.search.within("borecoal", 2), ["kale"])
+        self.assertEqual(self.search.within("cab", 3), ["car", "kale"])
+        self.assertEqual(self.search.within("cab", 3, limit=1), ["car"])
+
+
+class AttributeIndexTestCase(TestCase):
+    def setUp(self):
+        self.missing = object()
+        self.values = {"a": 3, "b": 1, "c": 3, "d": None, "e": self.missing, "f": 2}
+        self.index = AttributeIndex(list(self.values), self.values.get, self.missing)
+
+    def test_get(self):
+        self.assertEqual(self.index.get(3), ["a", "c"])
+        self.assertEqual(self.index.get(None), ["d"])
+        self.assertEqual(self.index.get(7), [])
+
+    def test_positions(self):
+        self.assertEqual(set(self.index.positions("exact", 3)), {0, 2})
+        self.assertEqual(set(self.index.positions("in", [1, 2, 7])), {1, 5})
+        self.assertEqual(set(self.index.positions("gt", 1)), {0, 2, 5})
+        self.assertEqual(set(self.index.positions("gte", 2)), {0, 2, 5})
+        self.assertEqual(set(self.index.positions("lt", 3)), {1, 5})
+        self.assertEqual(set(self.index.positions("lte", 0)), set())
+        with self.assertRaises(ValueError):
+            self.index.positions("contains", 3)
+
+    def test_unique(self):
+        values = {"a": 1, "b": 2}
+        index = AttributeIndex(list(values), values.get, None, unique=True)
+        self.assertEqual(index.get(2), "b")
+        self.assertIsNone(index.get(3))
+        with self.assertRaises(ValueError):
+            AttributeIndex(["a", "b"], lambda node: 1, None, unique=True)
+
+    def test_unorderable(self):
+        values = {"a": 1, "b": "x"}
+        index = AttributeIndex(list(values), values.get, None)
+        self.assertEqual(index.get("x"), ["b"])
+        with self.assertRaises(TypeError):
+            index.positions("gt", 0)